@@ -4,12 +4,15 @@ RAG (Retrieval-Augmented Generation) system for PDF documents with conversation
 """
 
 import os
+import re
 import hashlib
 import json
 import asyncio
 import uuid
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, AsyncGenerator
+from typing import List, Dict, Any, Optional, Union, AsyncGenerator, Iterable, Iterator
 from datetime import datetime
 import uvicorn
 
@@ -20,7 +23,7 @@ from pydantic import BaseModel, Field
 from sse_starlette.sse import EventSourceResponse
 
 # Import existing modules
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -28,9 +31,11 @@ from langchain.callbacks.base import AsyncCallbackHandler
 from langchain.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 from openai import OpenAI
-import PyPDF2
+import aiofiles
 import fitz  # PyMuPDF
 
+from embedding_quant import quantized_fields
+
 # Streaming Callback Handler
 
 
@@ -125,14 +130,18 @@ class SystemStatus(BaseModel):
 
 # === Configuration ===
 APP_NAME = os.getenv("APP_NAME", "Tanya Ma'il")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 client_openai = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
+    api_key=OPENAI_API_KEY,
     base_url=os.getenv("OPENAI_API_BASE")
 )
 
 MONGO_URI = os.getenv("MONGO_URI")
-# MONGO_URI_LOCAL = "mongodb://localhost:27017"
+MONGO_URI_LOCAL = "mongodb://localhost:27017"
+# One client per process; size the pool for the uvicorn / bulk worker concurrency
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = 5
 DB_NAME =   os.getenv("DB_NAME", "RAG_DB")
 COLLECTION_NAME =  os.getenv("COLLECTION_NAME", "pdf_docs")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
@@ -141,12 +150,21 @@ MODEL_MAX_TOKENS = int(os.getenv("MODEL_MAX_TOKENS", "2048"))
 
 # PDF Configuration
 PDF_FOLDER = "pdf_documents"
+FILE_HASH_ALGORITHM = os.getenv("FILE_HASH_ALGORITHM", "md5").lower()
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Store chunk embeddings as int8 + scale instead of float arrays
+QUANTIZE_EMBEDDINGS = os.getenv("QUANTIZE_EMBEDDINGS", "true").lower() == "true"
 
 # Conversation Configuration
 MAX_CONVERSATION_HISTORY = 10
 CONVERSATION_CONTEXT_WINDOW = 3
+# Substring match (like the old `in query.lower()` checks) so affixed forms
+# such as "melanjutkan" or "contohnya" still count as follow-ups
+FOLLOW_UP_RE = re.compile("|".join(map(re.escape, [
+    "lanjut", "selanjutnya", "lebih detail", "contoh", "bagaimana",
+    "jelaskan lebih", "detail", "itu", "tersebut", "tadi", "sebelumnya"
+])), re.IGNORECASE)
 
 # === MongoDB Connection ===
 
@@ -156,7 +174,8 @@ def connect_mongodb():
     if MONGO_URI:
         try:
             mongo_client = MongoClient(
-                MONGO_URI, serverSelectionTimeoutMS=5000)
+                MONGO_URI, serverSelectionTimeoutMS=5000, maxPoolSize=MONGO_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE, retryWrites=True)
             mongo_client.admin.command('ping')
             return mongo_client
         except Exception as e:
@@ -164,7 +183,8 @@ def connect_mongodb():
 
     try:
         mongo_client = MongoClient(
-            MONGO_URI_LOCAL, serverSelectionTimeoutMS=3000)
+            MONGO_URI_LOCAL, serverSelectionTimeoutMS=3000, maxPoolSize=MONGO_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE, retryWrites=True)
         mongo_client.admin.command('ping')
         return mongo_client
     except Exception as e:
@@ -180,6 +200,16 @@ if mongo_client is None:
 db = mongo_client[DB_NAME]
 collection = db[COLLECTION_NAME]
 
+
+def ensure_indexes():
+    """Create the chunk indexes used by processed-file checks (idempotent)"""
+    # Serves is_pdf_processed lookups and the force-reprocess delete
+    collection.create_index([("filename", ASCENDING), ("file_hash", ASCENDING)])
+    try:
+        collection.create_index([("doc_id", ASCENDING)], unique=True)
+    except Exception as e:
+        print(f"⚠️ Could not create unique doc_id index: {e}")
+
 # === Session Manager ===
 
 
@@ -294,59 +324,93 @@ session_manager = SessionManager()
 # === Utility Functions ===
 
 
-def extract_text_from_pdf(pdf_path: str, method: str = "pymupdf") -> str:
-    """Extract text from PDF file"""
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """Yield text of each PDF page"""
     try:
-        if method == "pymupdf":
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text() + "\n"
-            doc.close()
-            return text
-        elif method == "pypdf2":
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                yield page.get_text("text") + "\n"
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {e}")
 
 
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """Extract text from PDF file"""
+    return "".join(iter_pdf_pages(pdf_path))
+
+
 def get_file_hash(file_path: str) -> str:
-    """Generate hash for file"""
-    hash_md5 = hashlib.md5()
+    """Generate hash for file, reusing it while size and mtime are unchanged"""
+    stat = os.stat(file_path)
+    return _hash_file(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=1024)
+def _hash_file(file_path: str, size: int, mtime_ns: int) -> str:
+    """Streaming file hash (size and mtime_ns only key the cache)"""
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, FILE_HASH_ALGORITHM).hexdigest()
 
+        hasher = hashlib.new(FILE_HASH_ALGORITHM)
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+        return hasher.hexdigest()
 
-def split_text_into_chunks(text: str, filename: str) -> List[Dict[str, Any]]:
-    """Split text into chunks"""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-    )
 
-    chunks = text_splitter.split_text(text)
+# Chunking parameters are fixed, so one splitter is shared by every upload
+TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+)
+
 
-    documents = []
-    for i, chunk in enumerate(chunks):
-        doc = {
-            "text": chunk,
-            "filename": filename,
-            "chunk_id": i,
-            "source": "pdf",
-            "chunk_size": len(chunk)
-        }
-        documents.append(doc)
+def make_doc_id(filename: str, file_hash: str, chunk_id: int) -> str:
+    """Unique chunk id; includes the content hash so a changed file never collides with its old chunks"""
+    return f"{filename}_{file_hash[:16]}_chunk_{chunk_id}"
 
-    return documents
+
+def make_chunk_doc(chunk: str, filename: str, chunk_id: int) -> Dict[str, Any]:
+    """Chunk record shared by the splitters"""
+    return {
+        "text": chunk,
+        "filename": filename,
+        "chunk_id": chunk_id,
+        "source": "pdf",
+        "chunk_size": len(chunk)
+    }
+
+
+def split_text_into_chunks(text: str, filename: str) -> List[Dict[str, Any]]:
+    """Split text into chunks"""
+    return [make_chunk_doc(chunk, filename, i)
+            for i, chunk in enumerate(TEXT_SPLITTER.split_text(text))]
+
+
+def iter_text_chunks(pages: Iterable[str], filename: str) -> Iterator[Dict[str, Any]]:
+    """Chunk a stream of page texts, holding only a few chunks of text at a time"""
+    buffer = ""
+    chunk_id = 0
+    for page in pages:
+        buffer += page
+        if len(buffer) < 4 * CHUNK_SIZE:
+            continue
+        chunks = TEXT_SPLITTER.split_text(buffer)
+        if not chunks:  # whitespace only
+            buffer = ""
+            continue
+        # The last chunk may continue on the next page; carry it (and its
+        # original separators) over instead of emitting it now
+        for chunk in chunks[:-1]:
+            yield make_chunk_doc(chunk, filename, chunk_id)
+            chunk_id += 1
+        carry_from = buffer.rfind(chunks[-1])
+        buffer = buffer[carry_from:] if carry_from >= 0 else chunks[-1]
+
+    for chunk in TEXT_SPLITTER.split_text(buffer):
+        yield make_chunk_doc(chunk, filename, chunk_id)
+        chunk_id += 1
 
 
 def get_embedding(text: str) -> List[float]:
@@ -361,19 +425,41 @@ def get_embedding(text: str) -> List[float]:
         raise Exception(f"Error creating embedding: {e}")
 
 
+_embeddings = None
+_chroma = None
+_chroma_lock = threading.Lock()
+
+
+def get_embeddings() -> OpenAIEmbeddings:
+    """Get shared embeddings client"""
+    global _embeddings
+    if _embeddings is None:
+        with _chroma_lock:
+            if _embeddings is None:
+                _embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    return _embeddings
+
+
+def get_chroma() -> Optional[Chroma]:
+    """Get shared Chroma store, opened on first use once it has been built"""
+    global _chroma
+    if _chroma is None and os.path.exists("chroma_pdf_db"):
+        embeddings = get_embeddings()
+        with _chroma_lock:
+            if _chroma is None:
+                _chroma = Chroma(persist_directory="chroma_pdf_db",
+                                 embedding_function=embeddings)
+    return _chroma
+
+
 def search_similar_documents(query: str, top_k: int = 3, filename_filter: str = None):
     """Search for similar documents"""
     try:
-        os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-        if not os.path.exists("chroma_pdf_db"):
+        chroma = get_chroma()
+        if chroma is None:
             raise Exception(
                 "ChromaDB not built. Please build vector store first.")
 
-        chroma = Chroma(persist_directory="chroma_pdf_db",
-                        embedding_function=embeddings)
-
         filter_dict = {
             "filename": filename_filter} if filename_filter else None
         results = chroma.similarity_search(query, k=top_k, filter=filter_dict)
@@ -436,7 +522,7 @@ async def health_check():
             mongo_connected = False
 
         # Check ChromaDB
-        chroma_available = os.path.exists("chroma_pdf_db")
+        chroma_available = _chroma is not None or os.path.exists("chroma_pdf_db")
 
         # Count documents
         total_docs = collection.count_documents({})
@@ -446,7 +532,7 @@ async def health_check():
         unique_files = len(list(collection.aggregate(pipeline)))
 
         # Check OpenAI configuration
-        openai_configured = bool(os.getenv("OPENAI_API_KEY"))
+        openai_configured = bool(OPENAI_API_KEY)
 
         status = "healthy" if all(
             [mongo_connected, openai_configured]) else "unhealthy"
@@ -478,11 +564,11 @@ async def upload_pdf(
         # Create PDF folder if not exists
         os.makedirs(PDF_FOLDER, exist_ok=True)
 
-        # Save uploaded file
+        # Save uploaded file in 1 MB chunks instead of buffering it whole
         file_path = os.path.join(PDF_FOLDER, file.filename)
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        async with aiofiles.open(file_path, "wb") as f:
+            while chunk := await file.read(1 << 20):
+                await f.write(chunk)
 
         # Process file in background
         background_tasks.add_task(process_pdf_file, file_path)
@@ -490,7 +576,7 @@ async def upload_pdf(
         return APIResponse(
             status="success",
             message=f"File {file.filename} uploaded successfully and is being processed",
-            data={"filename": file.filename, "size": len(content)}
+            data={"filename": file.filename, "size": os.path.getsize(file_path)}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
@@ -517,23 +603,27 @@ def process_pdf_file(file_path: str):
         documents = split_text_into_chunks(text, filename)
 
         # Process each chunk
+        upload_date = datetime.now().isoformat()  # one timestamp per file
         for doc in documents:
             embedding = get_embedding(doc["text"])
             if not embedding:
                 continue
 
             mongo_doc = {
-                "doc_id": f"{filename}_chunk_{doc['chunk_id']}",
+                "doc_id": make_doc_id(filename, file_hash, doc['chunk_id']),
                 "filename": filename,
                 "file_hash": file_hash,
                 "text": doc["text"],
                 "chunk_id": doc["chunk_id"],
                 "source": doc["source"],
                 "chunk_size": doc["chunk_size"],
-                "embedding": embedding,
                 "kategori": "pdf_document",
-                "upload_date": datetime.now().isoformat()
+                "upload_date": upload_date
             }
+            if QUANTIZE_EMBEDDINGS:
+                mongo_doc.update(quantized_fields(embedding))
+            else:
+                mongo_doc["embedding"] = embedding
 
             collection.insert_one(mongo_doc)
     except Exception as e:
@@ -559,12 +649,9 @@ async def build_vectorstore():
             } for doc in docs
         ]
 
-        os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
         Chroma.from_texts(
             texts,
-            embeddings,
+            get_embeddings(),
             metadatas=metadatas,
             persist_directory="chroma_pdf_db"
         )
@@ -599,13 +686,7 @@ async def ask_question(request: QuestionRequest):
         # Enhanced query with conversation context
         enhanced_query = query
         if conversation_context:
-            follow_up_indicators = [
-                "lanjut", "selanjutnya", "lebih detail", "contoh", "bagaimana",
-                "jelaskan lebih", "detail", "itu", "tersebut", "tadi", "sebelumnya"
-            ]
-
-            is_follow_up = any(indicator in query.lower()
-                               for indicator in follow_up_indicators)
+            is_follow_up = FOLLOW_UP_RE.search(query) is not None
 
             if is_follow_up:
                 last_question = conversation_manager.conversation_history[-1][
@@ -923,11 +1004,12 @@ async def startup_event():
     try:
         mongo_client.admin.command('ping')
         print("✅ MongoDB connection successful")
+        ensure_indexes()
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
 
     # Check OpenAI configuration
-    if os.getenv("OPENAI_API_KEY"):
+    if OPENAI_API_KEY:
         print("✅ OpenAI API key configured")
     else:
         print("⚠️ OpenAI API key not found")
@@ -945,10 +1027,13 @@ async def shutdown_event():
 
 # === Main ===
 if __name__ == "__main__":
+    # Sessions are in-process here, so more than one worker splits them
+    workers = int(os.getenv("API_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
     uvicorn.run(
         "api:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        workers=workers,
+        reload=os.getenv("RELOAD") == "1" and workers == 1,
         log_level="info"
     )
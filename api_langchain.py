@@ -3,44 +3,74 @@ Updated API with LangChain Integration
 """
 
 import os
+import re
 import hashlib
-import json
 import asyncio
-import uuid
+import base64
+import secrets
+import heapq
+import itertools
+import time
+import threading
+from collections import deque, OrderedDict
+from functools import lru_cache
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, AsyncGenerator
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Union, AsyncGenerator, Iterator, Iterable
+from datetime import datetime, timedelta
 import uvicorn
+import aiofiles
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, BackgroundTasks
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field
 from sse_starlette.sse import EventSourceResponse
 
 # Import existing modules
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import BulkWriteError
+from motor.motor_asyncio import AsyncIOMotorClient
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_openai import ChatOpenAI
 from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.documents import Document
 from dotenv import load_dotenv
-from openai import OpenAI
-import PyPDF2
-import fitz  # PyMuPDF
+from openai import OpenAI, AsyncOpenAI
+import tiktoken
+import orjson
 
 # Import our simplified LangChain RAG system
-from simple_langchain import SimpleLangChainRAG, SimpleStreamingHandler
+from simple_langchain import SimpleLangChainRAG, SimpleStreamingHandler, CHROMA_COLLECTION_METADATA
+from semantic_cache import SemanticCache, normalize_question
+from local_embeddings import (
+    create_embeddings,
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    OPENAI_HTTP_CLIENT,
+    OPENAI_ASYNC_HTTP_CLIENT
+)
+from pdf_extract import get_page_texts, iter_page_texts, shutdown_pdf_workers
+from embedding_quant import quantized_fields, pack_float32, unpack_float32
+from vector_index import VectorIndex
+from session_store import RedisSessionStore, REDIS_AVAILABLE as SESSION_STORE_AVAILABLE
 
 # Load environment variables
 load_dotenv()
 
 # === API Models (Pydantic) ===
 
+# Models are immutable once validated; unknown fields are dropped, not stored
+MODEL_CONFIG = ConfigDict(extra="ignore", frozen=True, str_strip_whitespace=True)
+
 
 class QuestionRequest(BaseModel):
     """Model for question requests"""
+    model_config = MODEL_CONFIG
+
     question: str = Field(
         ..., description="The question to ask about the PDF documents", min_length=1)
     top_k: int = Field(
@@ -56,21 +86,28 @@ class QuestionRequest(BaseModel):
 
 class ConversationContextRequest(BaseModel):
     """Model for conversation context configuration"""
+    model_config = MODEL_CONFIG
+
     context_window: int = Field(
         3, description="Number of recent conversations to use as context", ge=1, le=10)
 
 
 class QuestionResponse(BaseModel):
     """Model for question responses"""
+    model_config = MODEL_CONFIG
+
     question: str
     answer: str
     sources: List[str]
     timestamp: str
     session_id: str
+    cache_hit: bool = False
 
 
 class FileInfo(BaseModel):
     """Model for file information"""
+    model_config = MODEL_CONFIG
+
     filename: str
     chunks: int
     file_hash: str
@@ -79,6 +116,8 @@ class FileInfo(BaseModel):
 
 class ConversationHistory(BaseModel):
     """Model for conversation history"""
+    model_config = MODEL_CONFIG
+
     session_id: str
     history: List[Dict[str, Any]]
     total_exchanges: int
@@ -86,6 +125,8 @@ class ConversationHistory(BaseModel):
 
 class SearchResult(BaseModel):
     """Model for search results"""
+    model_config = MODEL_CONFIG
+
     doc_id: str
     filename: str
     content: str
@@ -94,6 +135,8 @@ class SearchResult(BaseModel):
 
 class APIResponse(BaseModel):
     """Generic API response model"""
+    model_config = MODEL_CONFIG
+
     status: str
     message: str
     data: Optional[Any] = None
@@ -101,6 +144,8 @@ class APIResponse(BaseModel):
 
 class SystemStatus(BaseModel):
     """Model for system status"""
+    model_config = MODEL_CONFIG
+
     status: str
     mongodb_connected: bool
     chroma_available: bool
@@ -112,64 +157,191 @@ class SystemStatus(BaseModel):
 
 # === Configuration ===
 APP_NAME = os.getenv("APP_NAME", "Tanya Ma'il")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 client_openai = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    base_url=os.getenv("OPENAI_API_BASE")
+    api_key=OPENAI_API_KEY,
+    base_url=os.getenv("OPENAI_API_BASE"),
+    http_client=OPENAI_HTTP_CLIENT
+)
+async_client_openai = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=os.getenv("OPENAI_API_BASE"),
+    http_client=OPENAI_ASYNC_HTTP_CLIENT
 )
 
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_URI_LOCAL = "mongodb://localhost:27017"
 DB_NAME = os.getenv("DB_NAME", "RAG_DB")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "pdf_docs")
+EMBEDDING_CACHE_COLLECTION = "embedding_cache"
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
 MODEL_TEMPERATURE = float(os.getenv("MODEL_TEMPERATURE", "0"))
 MODEL_MAX_TOKENS = int(os.getenv("MODEL_MAX_TOKENS", "2048"))
+EMBEDDING_MODEL = "text-embedding-3-small"
+# OpenAI caps a single embeddings request at 300k tokens across all inputs
+EMBEDDING_MAX_BATCH_TOKENS = 300_000
+EMBEDDING_ENCODING = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+# Embedding requests in flight at once while ingesting a single PDF
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "5"))
+EMBEDDING_SEMAPHORE = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+# Chunks per embedding request dispatched while a PDF is still being read
+INGEST_BATCH_SIZE = 96
+# MongoDB write error code for a unique index violation
+DUPLICATE_KEY_ERROR = 11000
+
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", "50"))
+# Conversation memory lives in-process, so keep 1 worker unless REDIS_URL is set
+API_WORKERS = int(os.getenv("API_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+# Auto-reload is for development only and cannot be combined with workers
+API_RELOAD = os.getenv("RELOAD") == "1"
+GZIP_MINIMUM_SIZE = 1024
+ALLOWED_ORIGINS = tuple(
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip())
+SSE_HEADERS = {"X-Accel-Buffering": "no", "Cache-Control": "no-cache"}
+STREAM_TIMEOUT = 120  # seconds, total per streamed answer
+STREAM_TIMEOUT_ERROR = "Error: response timed out"
+# Store chunk embeddings in MongoDB as int8 + scale instead of float arrays
+QUANTIZE_EMBEDDINGS = os.getenv("QUANTIZE_EMBEDDINGS", "true").lower() == "true"
+# Serve legacy search from an in-memory matrix of the Mongo embeddings
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+# Each worker holds its own index; reload it from MongoDB this often (seconds,
+# 0 disables) to pick up chunks written by other workers or bulk_pdf_processor
+VECTOR_INDEX_TTL = int(os.getenv("VECTOR_INDEX_TTL", "300"))
 
 # PDF Configuration
 PDF_FOLDER = "pdf_documents"
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
+# md5 matches hashes stored by earlier versions; sha256 (SHA-NI) or blake2b are
+# faster on modern CPUs but make previously stored files look new
+FILE_HASH_ALGORITHM = os.getenv("FILE_HASH_ALGORITHM", "md5").lower()
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+CHROMA_DIR = "chroma_pdf_db"
+CHROMA_DIR_CHECK_TTL = 30  # seconds
+# Chunks are measured in embedding-model tokens (~1000 characters each)
+CHUNK_TOKENS = 250
+CHUNK_OVERLAP_TOKENS = 50
 
 # Conversation Configuration
 MAX_CONVERSATION_HISTORY = 10
 CONVERSATION_CONTEXT_WINDOW = 3
+# Legacy sessions kept in memory; the least recently used is evicted beyond this
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+SESSION_SWEEP_INTERVAL = 60  # seconds between background expiry sweeps
+# Substring match (like the old `in query.lower()` checks) so affixed forms
+# such as "melanjutkan" or "contohnya" still count as follow-ups
+FOLLOW_UP_RE = re.compile("|".join(map(re.escape, [
+    "lanjut", "selanjutnya", "lebih detail", "contoh", "bagaimana",
+    "jelaskan lebih", "detail", "itu", "tersebut", "tadi", "sebelumnya"
+])), re.IGNORECASE)
+
+# Semantic Cache Configuration
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "600"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.15"))
+# Kept apart from CHROMA_DIR: creating it must not make the empty document store look built
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", "chroma_cache_db")
+REDIS_URL = os.getenv("REDIS_URL")
 
 # === MongoDB Connection ===
 
 
 def connect_mongodb():
-    """Connect to MongoDB with fallback to local"""
+    """Connect to MongoDB with fallback to local, returning (client, uri)"""
     if MONGO_URI:
         try:
             mongo_client = MongoClient(
-                MONGO_URI, serverSelectionTimeoutMS=5000)
+                MONGO_URI, serverSelectionTimeoutMS=5000, maxPoolSize=MONGO_POOL_SIZE)
             mongo_client.admin.command('ping')
-            return mongo_client
+            return mongo_client, MONGO_URI
         except Exception as e:
             print(f"Remote MongoDB failed: {e}")
 
     try:
         mongo_client = MongoClient(
-            MONGO_URI_LOCAL, serverSelectionTimeoutMS=3000)
+            MONGO_URI_LOCAL, serverSelectionTimeoutMS=3000, maxPoolSize=MONGO_POOL_SIZE)
         mongo_client.admin.command('ping')
-        return mongo_client
+        return mongo_client, MONGO_URI_LOCAL
     except Exception as e:
         print(f"Local MongoDB failed: {e}")
-        return None
+        return None, None
 
 
 # Initialize MongoDB
-mongo_client = connect_mongodb()
+mongo_client, mongo_uri = connect_mongodb()
 if mongo_client is None:
     raise Exception("Cannot connect to MongoDB")
 
 db = mongo_client[DB_NAME]
 collection = db[COLLECTION_NAME]
 
+# Async client for request handlers; the sync client above serves background
+# ingestion and the LangChain RAG system
+async_mongo_client = AsyncIOMotorClient(
+    mongo_uri, maxPoolSize=MONGO_POOL_SIZE, maxIdleTimeMS=30000)
+async_collection = async_mongo_client[DB_NAME][COLLECTION_NAME]
+# Chunk texts + full-precision embeddings keyed by file content hash, so a
+# re-uploaded (or renamed) identical PDF is never parsed or embedded again
+async_embedding_cache = async_mongo_client[DB_NAME][EMBEDDING_CACHE_COLLECTION]
+
+# === Shared LangChain Components ===
+# Created once per process so requests reuse HTTP pools, tokenizer state and
+# the opened Chroma store.
+EMBEDDINGS = create_embeddings()
+LLM = ChatOpenAI(
+    model_name=MODEL_NAME,
+    temperature=MODEL_TEMPERATURE,
+    max_tokens=MODEL_MAX_TOKENS,
+    openai_api_key=OPENAI_API_KEY,
+    streaming=True,
+    http_client=OPENAI_HTTP_CLIENT,
+    http_async_client=OPENAI_ASYNC_HTTP_CLIENT
+)
+VECTORSTORE = None
+_vectorstore_lock = threading.Lock()
+
+
+def get_vectorstore() -> Optional[Chroma]:
+    """Get shared Chroma vector store, opening it once it has been built"""
+    global VECTORSTORE
+    if VECTORSTORE is None and os.path.exists(CHROMA_DIR):
+        # Threadpool requests may race here; only one should open the store
+        with _vectorstore_lock:
+            if VECTORSTORE is None:
+                VECTORSTORE = Chroma(persist_directory=CHROMA_DIR,
+                                     embedding_function=EMBEDDINGS,
+                                     collection_metadata=CHROMA_COLLECTION_METADATA)
+    return VECTORSTORE
+
+
+_chroma_dir_checked_at = 0.0
+_chroma_dir_exists = False
+
+
+def chroma_dir_exists() -> bool:
+    """Whether the Chroma directory exists, re-checked at most every CHROMA_DIR_CHECK_TTL seconds"""
+    global _chroma_dir_checked_at, _chroma_dir_exists
+    now = time.monotonic()
+    if now - _chroma_dir_checked_at > CHROMA_DIR_CHECK_TTL:
+        _chroma_dir_exists = os.path.isdir(CHROMA_DIR)
+        _chroma_dir_checked_at = now
+    return _chroma_dir_exists
+
+
+try:
+    get_vectorstore()
+except Exception as e:
+    print(f"⚠️ Failed to load vectorstore: {e}")
+
 # === Initialize LangChain RAG System ===
 try:
-    langchain_rag = SimpleLangChainRAG(mongo_collection=collection)
+    langchain_rag = SimpleLangChainRAG(
+        mongo_collection=collection,
+        chroma_persist_dir=CHROMA_DIR,
+        llm=LLM,
+        embeddings=EMBEDDINGS,
+        vectorstore=VECTORSTORE,
+        redis_url=REDIS_URL
+    )
     LANGCHAIN_AVAILABLE = True
     print(f"✅ LangChain RAG System initialized")
 except Exception as e:
@@ -177,36 +349,144 @@ except Exception as e:
     LANGCHAIN_AVAILABLE = False
     print(f"⚠️ LangChain RAG System failed to initialize: {e}")
 
+# Identical context-free questions being answered right now (single-flight)
+INFLIGHT: Dict[str, asyncio.Future] = {}
+
+# Chunk embeddings for legacy search, loaded at startup, kept in step with this
+# worker's uploads and reloaded every VECTOR_INDEX_TTL for everyone else's
+VECTOR_INDEX = VectorIndex()
+VECTOR_INDEX_PROJECTION = {"_id": 0, "doc_id": 1, "filename": 1, "embedding": 1, "embedding_q8": 1}
+_vector_index_reloading = threading.Lock()
+
+# === Initialize Semantic Cache ===
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED and langchain_rag:
+    try:
+        semantic_cache = SemanticCache(
+            embeddings=EMBEDDINGS,
+            persist_dir=SEMANTIC_CACHE_DIR,
+            redis_url=REDIS_URL,
+            ttl=SEMANTIC_CACHE_TTL,
+            distance_threshold=SEMANTIC_CACHE_THRESHOLD
+        )
+        print(f"✅ Semantic cache initialized")
+    except Exception as e:
+        print(f"⚠️ Semantic cache failed to initialize: {e}")
+
 # === Session Manager (Legacy for non-LangChain) ===
 
 
+SESSION_ID_BYTES = 16
+SESSION_ID_POOL_SIZE = 256
+_session_id_pool: deque = deque()
+
+
+def new_session_id() -> str:
+    """Generate a random URL-safe session ID from a pool refilled with one urandom call"""
+    if not _session_id_pool:
+        entropy = secrets.token_bytes(SESSION_ID_BYTES * SESSION_ID_POOL_SIZE)
+        _session_id_pool.extend(
+            base64.urlsafe_b64encode(entropy[i:i + SESSION_ID_BYTES]).rstrip(b"=").decode()
+            for i in range(0, len(entropy), SESSION_ID_BYTES))
+    return _session_id_pool.popleft()
+
+
+
 class SessionManager:
     """Manages multiple user sessions (legacy system)"""
 
-    def __init__(self):
-        self.sessions: Dict[str, 'ConversationManager'] = {}
+    def __init__(self, store: Optional[RedisSessionStore] = None):
+        # Shared history in Redis when configured; the dicts below then act
+        # as this worker's cache of the sessions it has served
+        self.store = store
+        # Ordered least to most recently used
+        self.sessions: OrderedDict[str, 'ConversationManager'] = OrderedDict()
+        self.max_sessions = MAX_SESSIONS
         self.session_timeout = 3600  # 1 hour in seconds
         self.last_activity: Dict[str, datetime] = {}
+        # (earliest possible expiry, session_id) - one entry per session,
+        # re-pushed lazily when the session turns out to be still active
+        self._expiry_heap: List[tuple[datetime, str]] = []
+        # Reset managers from deleted sessions, reused for new ones
+        self._pool: deque['ConversationManager'] = deque(maxlen=256)
 
     def get_or_create_session(self, session_id: Optional[str] = None) -> tuple[str, 'ConversationManager']:
         """Get existing session or create new one"""
         # Clean up old sessions
-        self._cleanup_old_sessions()
+        self.cleanup_old_sessions()
 
         # If no session_id provided or session doesn't exist, create new
         if not session_id or session_id not in self.sessions:
-            session_id = str(uuid.uuid4())
-            self.sessions[session_id] = ConversationManager()
-            self.last_activity[session_id] = datetime.now()
+            session_id = new_session_id()
+            self._add_session(session_id)
         else:
             # Update last activity
+            self.sessions.move_to_end(session_id)
             self.last_activity[session_id] = datetime.now()
 
         return session_id, self.sessions[session_id]
 
+    def _add_session(self, session_id: str) -> 'ConversationManager':
+        while len(self.sessions) >= self.max_sessions:
+            self.delete_session(next(iter(self.sessions)))
+        now = datetime.now()
+        manager = self._pool.pop() if self._pool else ConversationManager()
+        self.sessions[session_id] = manager
+        self.last_activity[session_id] = now
+        heapq.heappush(self._expiry_heap, (now + timedelta(seconds=self.session_timeout), session_id))
+        return manager
+
+    async def open_session(self, session_id: Optional[str] = None) -> tuple[str, 'ConversationManager']:
+        """Get or create session; with a store, a client-supplied ID is kept and its history loaded"""
+        if self.store is None:
+            return self.get_or_create_session(session_id)
+
+        self.cleanup_old_sessions()
+        session_id = session_id or new_session_id()
+        manager = await self.load_session(session_id) or self._add_session(session_id)
+        return session_id, manager
+
+    async def load_session(self, session_id: str) -> Optional['ConversationManager']:
+        """Get existing session, refreshed from the store when configured"""
+        manager = self.get_session(session_id)
+        if self.store is None:
+            return manager
+
+        stored = await self.store.load(session_id)
+        if stored is None:
+            return manager  # created here, no turns yet
+        if manager is None:
+            manager = self._add_session(session_id)
+        manager.conversation_history, context_window = stored
+        if context_window is not None:
+            manager.context_window = context_window
+        return manager
+
+    async def record_exchange(self, session_id: str, manager: 'ConversationManager',
+                              question: str, answer: str, sources: List[str] = None):
+        """Add exchange to the session and the store"""
+        manager.add_exchange(question, answer, sources)
+        if self.store is not None:
+            await self.store.append(
+                session_id, manager.conversation_history[-1], manager.max_history)
+
+    async def configure_session(self, session_id: str, manager: 'ConversationManager', context_window: int):
+        """Set the session's context window"""
+        manager.context_window = context_window
+        if self.store is not None:
+            await self.store.set_context_window(session_id, context_window)
+
+    async def remove_session(self, session_id: str) -> bool:
+        """Delete a session here and from the store"""
+        deleted = self.delete_session(session_id)
+        if self.store is not None:
+            deleted = await self.store.delete(session_id) or deleted
+        return deleted
+
     def get_session(self, session_id: str) -> Optional['ConversationManager']:
         """Get existing session"""
         if session_id in self.sessions:
+            self.sessions.move_to_end(session_id)
             self.last_activity[session_id] = datetime.now()
             return self.sessions[session_id]
         return None
@@ -214,23 +494,28 @@ class SessionManager:
     def delete_session(self, session_id: str) -> bool:
         """Delete a session"""
         if session_id in self.sessions:
-            del self.sessions[session_id]
+            conversation_manager = self.sessions.pop(session_id)
+            conversation_manager.reset()
+            self._pool.append(conversation_manager)
             if session_id in self.last_activity:
                 del self.last_activity[session_id]
             return True
         return False
 
-    def _cleanup_old_sessions(self):
-        """Remove sessions that have been inactive"""
+    def cleanup_old_sessions(self):
+        """Remove sessions that have been inactive (only touches due heap entries)"""
         current_time = datetime.now()
-        sessions_to_remove = []
-
-        for session_id, last_time in self.last_activity.items():
-            if (current_time - last_time).total_seconds() > self.session_timeout:
-                sessions_to_remove.append(session_id)
-
-        for session_id in sessions_to_remove:
-            self.delete_session(session_id)
+        timeout = timedelta(seconds=self.session_timeout)
+
+        while self._expiry_heap and self._expiry_heap[0][0] < current_time:
+            _, session_id = heapq.heappop(self._expiry_heap)
+            last_time = self.last_activity.get(session_id)
+            if last_time is None:
+                continue  # already deleted
+            if current_time - last_time > timeout:
+                self.delete_session(session_id)
+            else:
+                heapq.heappush(self._expiry_heap, (last_time + timeout, session_id))
 
 # === Conversation Manager (Legacy) ===
 
@@ -284,93 +569,244 @@ class ConversationManager:
         self.conversation_history = []
         self.current_session_id = self._generate_session_id()
 
+    def reset(self):
+        """Return to freshly created state so the instance can be reused"""
+        self.conversation_history.clear()
+        self.context_window = CONVERSATION_CONTEXT_WINDOW
+        self.current_session_id = self._generate_session_id()
+
 
 # Global session manager (for legacy system)
-session_manager = SessionManager()
+session_manager = SessionManager(
+    RedisSessionStore(REDIS_URL) if REDIS_URL and SESSION_STORE_AVAILABLE else None)
 
 # === Utility Functions ===
 
 
-def extract_text_from_pdf(pdf_path: str, method: str = "pymupdf") -> str:
+def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from PDF file"""
     try:
-        if method == "pymupdf":
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text() + "\n"
-            doc.close()
-            return text
-        elif method == "pypdf2":
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+        return "\n".join(get_page_texts(pdf_path))
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {e}")
 
 
-def get_file_hash(file_path: str) -> str:
-    """Generate hash for file"""
-    hash_md5 = hashlib.md5()
+@lru_cache(maxsize=1024)
+def _hash_file(file_path: str, size: int, mtime_ns: int) -> str:
+    """Hash file contents (size/mtime only key the cache)"""
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, FILE_HASH_ALGORITHM).hexdigest()
 
+        hasher = hashlib.new(FILE_HASH_ALGORITHM)
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+        return hasher.hexdigest()
 
-def split_text_into_chunks(text: str, filename: str) -> List[Dict[str, Any]]:
+
+def get_file_hash(file_path: str) -> str:
+    """Generate hash for file, reusing the digest while the file is unchanged"""
+    stat = os.stat(file_path)
+    return _hash_file(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def decode_token_window(tokens: List[int]) -> str:
+    """Decode a token slice, trimming UTF-8 sequences split at either edge"""
+    data = EMBEDDING_ENCODING.decode_bytes(tokens)
+    start = 0
+    while start < min(len(data), 3) and 0x80 <= data[start] < 0xC0:
+        start += 1
+    end = len(data)
+    for i in range(end - 1, max(start, end - 4) - 1, -1):
+        byte = data[i]
+        if byte < 0x80:
+            break
+        if byte >= 0xC0:
+            size = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            if end - i < size:
+                end = i
+            break
+    return data[start:end].decode("utf-8", errors="replace")
+
+
+def iter_token_windows(texts: Iterable[str]) -> Iterator[str]:
+    """Yield overlapping windows of CHUNK_TOKENS tokens over a stream of texts"""
+    step = CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS
+    buffer: List[int] = []
+    fresh = 0  # buffered tokens not yet part of an emitted window
+
+    for text in texts:
+        tokens = EMBEDDING_ENCODING.encode(text + "\n", disallowed_special=())
+        buffer.extend(tokens)
+        fresh += len(tokens)
+        while len(buffer) >= CHUNK_TOKENS:
+            chunk = decode_token_window(buffer[:CHUNK_TOKENS]).strip()
+            if chunk:
+                yield chunk
+            del buffer[:step]
+            fresh = len(buffer) - CHUNK_OVERLAP_TOKENS
+
+    if fresh > 0:
+        chunk = decode_token_window(buffer).strip()
+        if chunk:
+            yield chunk
+
+
+def make_chunk_doc(text: str, filename: str, chunk_id: int) -> Dict[str, Any]:
+    """Chunk record shared by the splitters"""
+    return {
+        "text": text,
+        "filename": filename,
+        "chunk_id": chunk_id,
+        "source": "pdf",
+        "chunk_size": len(text)
+    }
+
+
+def split_text_into_chunks(text: str, filename: str, start_id: int = 0) -> List[Dict[str, Any]]:
     """Split text into chunks"""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-    )
+    return [
+        make_chunk_doc(chunk, filename, i)
+        for i, chunk in enumerate(iter_token_windows([text]), start_id)
+    ]
 
-    chunks = text_splitter.split_text(text)
 
-    documents = []
-    for i, chunk in enumerate(chunks):
-        doc = {
-            "text": chunk,
-            "filename": filename,
-            "chunk_id": i,
-            "source": "pdf",
-            "chunk_size": len(chunk)
-        }
-        documents.append(doc)
-
-    return documents
+def iter_pdf_chunks(pdf_path: str, filename: str) -> Iterator[Dict[str, Any]]:
+    """Yield PDF chunks as pages are extracted; windows may span page breaks"""
+    try:
+        for i, chunk in enumerate(iter_token_windows(iter_page_texts(pdf_path))):
+            yield make_chunk_doc(chunk, filename, i)
+    except Exception as e:
+        raise Exception(f"Error extracting text from PDF: {e}")
 
 
 def get_embedding(text: str) -> List[float]:
-    """Create embedding for text"""
+    """Create embedding for text (cached for repeated texts)"""
     try:
-        result = client_openai.embeddings.create(
-            input=[text],
-            model="text-embedding-3-small"
-        )
-        return result.data[0].embedding
+        return EMBEDDINGS.embed_query(text)
     except Exception as e:
         raise Exception(f"Error creating embedding: {e}")
 
 
+def iter_embedding_batches(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE,
+                           max_tokens: int = EMBEDDING_MAX_BATCH_TOKENS) -> Iterator[List[str]]:
+    """Yield batches limited by both input count and total token budget"""
+    batch, batch_tokens = [], 0
+    for text in texts:
+        tokens = len(EMBEDDING_ENCODING.encode(text, disallowed_special=()))
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+async def get_embeddings_batch(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    """Create embeddings for many texts, sending batches concurrently"""
+    async def embed(batch: List[str]) -> List[List[float]]:
+        async with EMBEDDING_SEMAPHORE:
+            result = await async_client_openai.embeddings.create(
+                input=batch,
+                model=EMBEDDING_MODEL
+            )
+        return [item.embedding for item in result.data]
+
+    try:
+        if EMBEDDING_BACKEND != "openai":
+            return await run_in_threadpool(EMBEDDINGS.embed_documents, texts)
+
+        # gather keeps batch order, so results line up with texts
+        results = await asyncio.gather(
+            *(embed(batch) for batch in iter_embedding_batches(texts, batch_size)))
+        return [embedding for batch in results for embedding in batch]
+    except Exception as e:
+        raise Exception(f"Error creating embeddings: {e}")
+
+
+async def embed_pdf_chunks(file_path: str, filename: str) -> tuple[List[Dict[str, Any]], List[List[float]]]:
+    """Chunk a PDF while it is read, embedding each full batch as later pages are extracted"""
+    documents = []
+    tasks = []
+    batch = []
+    try:
+        async for doc in iterate_in_threadpool(iter_pdf_chunks(file_path, filename)):
+            documents.append(doc)
+            batch.append(doc["text"])
+            if len(batch) >= INGEST_BATCH_SIZE:
+                tasks.append(asyncio.create_task(get_embeddings_batch(batch)))
+                batch = []
+        if batch:
+            tasks.append(asyncio.create_task(get_embeddings_batch(batch)))
+
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return documents, [embedding for result in results for embedding in result]
+
+
+def load_vector_index():
+    """Replace the in-memory index with every chunk embedding in MongoDB"""
+    VECTOR_INDEX.load(collection.find({}, VECTOR_INDEX_PROJECTION))
+
+
+def refresh_vector_index():
+    """Reload the index in the background once it is older than VECTOR_INDEX_TTL"""
+    if not VECTOR_INDEX_TTL or VECTOR_INDEX.age() < VECTOR_INDEX_TTL:
+        return
+    if not _vector_index_reloading.acquire(blocking=False):
+        return  # another thread is already reloading
+
+    def reload():
+        try:
+            load_vector_index()
+        except Exception as e:
+            print(f"⚠️ Could not reload vector index: {e}")
+        finally:
+            _vector_index_reloading.release()
+
+    threading.Thread(target=reload, daemon=True).start()
+
+
+def search_vector_index(query: str, top_k: int, filename_filter: Optional[str]) -> Optional[List[Document]]:
+    """Exact in-memory search; None when the index cannot answer"""
+    if not VECTOR_INDEX_ENABLED:
+        return None
+    refresh_vector_index()
+    if not len(VECTOR_INDEX):
+        return None
+    hits = VECTOR_INDEX.search(get_embedding(query), top_k, filename_filter)
+    if hits is None:
+        return None
+
+    texts = {
+        doc["doc_id"]: doc.get("text", "")
+        for doc in collection.find(
+            {"doc_id": {"$in": [doc_id for doc_id, _, _ in hits]}},
+            {"_id": 0, "doc_id": 1, "text": 1})
+    }
+    return [
+        Document(page_content=texts[doc_id],
+                 metadata={"doc_id": doc_id, "filename": filename, "score": score})
+        for doc_id, filename, score in hits if doc_id in texts
+    ]
+
+
 def search_similar_documents(query: str, top_k: int = 3, filename_filter: str = None):
     """Search for similar documents (legacy method)"""
     try:
-        os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        results = search_vector_index(query, top_k, filename_filter)
+        if results is not None:
+            return results
 
-        if not os.path.exists("chroma_pdf_db"):
+        chroma = get_vectorstore()
+        if chroma is None:
             raise Exception(
                 "ChromaDB not built. Please build vector store first.")
 
-        chroma = Chroma(persist_directory="chroma_pdf_db",
-                        embedding_function=embeddings)
-
         filter_dict = {
             "filename": filename_filter} if filename_filter else None
         results = chroma.similarity_search(query, k=top_k, filter=filter_dict)
@@ -380,23 +816,248 @@ def search_similar_documents(query: str, top_k: int = 3, filename_filter: str =
         raise Exception(f"Error searching documents: {e}")
 
 
+def is_cacheable(session_id: str) -> bool:
+    """Only context-free questions (no prior turns in session) are cached"""
+    return semantic_cache is not None and not langchain_rag.has_history(session_id)
+
+
+def lookup_cached_answer(question: str, session_id: str, cacheable: bool) -> Optional[Dict[str, Any]]:
+    """Return cached answer for question and record it in session memory"""
+    if not cacheable:
+        return None
+
+    cached = semantic_cache.lookup(question)
+    if cached:
+        langchain_rag.remember_exchange(session_id, question, cached["answer"])
+    return cached
+
+
+def singleflight_key(question: str, filename_filter: Optional[str], top_k: int) -> str:
+    """Key identifying interchangeable concurrent questions"""
+    raw = f"{normalize_question(question)}|{filename_filter or ''}|{top_k}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def ask_langchain_once(request: QuestionRequest, session_id: str) -> Dict[str, Any]:
+    """Answer a context-free question, sharing one RAG call among concurrent askers"""
+    key = singleflight_key(request.question, request.filename_filter, request.top_k)
+
+    future = INFLIGHT.get(key)
+    if future is not None:
+        result = await asyncio.shield(future)
+        await run_in_threadpool(
+            langchain_rag.remember_exchange, session_id, request.question, result["answer"])
+        return {**result, "session_id": session_id}
+
+    future = asyncio.get_running_loop().create_future()
+    INFLIGHT[key] = future
+    try:
+        result = await langchain_rag.ask_question(request.question, session_id)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        # Waiters must not hang on a leader that failed or was cancelled
+        future.set_exception(e if isinstance(e, Exception) else Exception("Request cancelled"))
+        future.exception()  # mark retrieved when nobody was waiting
+        raise
+    finally:
+        INFLIGHT.pop(key, None)
+
+
+async def load_cached_chunks(file_hash: str) -> List[Dict[str, Any]]:
+    """Return cached chunks (text + embedding) for a file hash, in chunk order"""
+    cached = await async_embedding_cache.find(
+        {"file_hash": file_hash, "backend": EMBEDDING_BACKEND}
+    ).sort("chunk_id", ASCENDING).to_list(None)
+    return [
+        {"chunk_id": doc["chunk_id"], "text": doc["text"],
+         "embedding": unpack_float32(doc["embedding"])}
+        for doc in cached
+    ]
+
+
+async def store_cached_chunks(file_hash: str, documents: List[Dict[str, Any]],
+                              embeddings: List[List[float]]):
+    """Remember chunk embeddings for a file hash"""
+    entries = [
+        {
+            "file_hash": file_hash,
+            "backend": EMBEDDING_BACKEND,
+            "chunk_id": doc["chunk_id"],
+            "text": doc["text"],
+            "embedding": pack_float32(embedding)
+        }
+        for doc, embedding in zip(documents, embeddings) if embedding
+    ]
+    if not entries:
+        return
+    try:
+        await async_embedding_cache.insert_many(entries, ordered=False)
+    except BulkWriteError:
+        pass  # another upload of the same file cached it first
+
+
+def invalidate_answer_cache():
+    """Drop cached answers after the document set changes"""
+    if semantic_cache:
+        semantic_cache.clear()
+
+
+# Chunk and file totals for /health in a single pass over the collection
+STATS_PIPELINE = [
+    {"$group": {"_id": "$filename", "chunks": {"$sum": 1}}},
+    {"$group": {"_id": None, "files": {"$sum": 1}, "docs": {"$sum": "$chunks"}}}
+]
+
+
+# === Application Lifespan ===
+
+
+async def sweep_sessions():
+    """Expire idle legacy sessions even when no new sessions are being created"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        session_manager.cleanup_old_sessions()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm shared resources on startup and release them on shutdown"""
+    print(f"🚀 {APP_NAME} API with LangChain starting up...")
+
+    # Create PDF folder
+    os.makedirs(PDF_FOLDER, exist_ok=True)
+    print(f"📁 PDF folder ready: {PDF_FOLDER}")
+
+    # Test MongoDB connection
+    try:
+        await async_mongo_client.admin.command('ping')
+        print("✅ MongoDB connection successful")
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+
+    # Unique chunk index makes the processed-file check an index lookup
+    try:
+        await async_collection.create_index(
+            [("filename", ASCENDING), ("file_hash", ASCENDING), ("chunk_id", ASCENDING)],
+            unique=True,
+            name="file_chunk_unique"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not create chunk index: {e}")
+    try:
+        await async_embedding_cache.create_index(
+            [("file_hash", ASCENDING), ("backend", ASCENDING), ("chunk_id", ASCENDING)],
+            unique=True,
+            name="file_hash_chunk_unique"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not create embedding cache index: {e}")
+
+    if VECTOR_INDEX_ENABLED:
+        try:
+            await run_in_threadpool(load_vector_index)
+            print(f"✅ Vector index loaded ({len(VECTOR_INDEX)} chunks)")
+        except Exception as e:
+            print(f"⚠️ Could not load vector index: {e}")
+
+    # Open vector store so the first request does not pay for it
+    if await run_in_threadpool(get_vectorstore) is not None:
+        print("✅ Vector store loaded")
+    else:
+        print("⚠️ Vector store not built yet")
+
+    # Check OpenAI configuration
+    if OPENAI_API_KEY:
+        print("✅ OpenAI API key configured")
+    else:
+        print("⚠️ OpenAI API key not found")
+
+    # Check LangChain system
+    if LANGCHAIN_AVAILABLE:
+        print("✅ LangChain RAG system ready")
+    else:
+        print("⚠️ LangChain RAG system not available - using legacy system")
+
+    print(f"🎉 {APP_NAME} API ready!")
+
+    session_sweeper = asyncio.create_task(sweep_sessions())
+
+    yield
+
+    print(f"🛑 {APP_NAME} API shutting down...")
+    session_sweeper.cancel()
+    if mongo_client:
+        mongo_client.close()
+        async_mongo_client.close()
+        print("🔌 MongoDB connection closed")
+
+    if session_manager.store is not None:
+        await session_manager.store.close()
+    shutdown_pdf_workers()
+    OPENAI_HTTP_CLIENT.close()
+    await OPENAI_ASYNC_HTTP_CLIENT.aclose()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (bytes out, no str round-trip)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Pre-serialized SSE frames; EventSourceResponse passes bytes through untouched
+_SSE_TOKEN_PREFIX = b'data: {"type":"content","token":'
+_SSE_FRAME_END = b"}\n\n"
+
+
+def sse_event(payload: Dict[str, Any]) -> bytes:
+    """Encode one SSE data frame"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def sse_token(token: str) -> bytes:
+    """Encode a content token frame without building the envelope dict"""
+    return _SSE_TOKEN_PREFIX + orjson.dumps(token) + _SSE_FRAME_END
+
+
+SSE_DONE = sse_event({"type": "done"})
+
+
+class SSEAwareGZipMiddleware(GZipMiddleware):
+    """GZip that leaves event streams alone so tokens are not held in the compressor"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            accept = dict(scope["headers"]).get(b"accept", b"")
+            if b"text/event-stream" in accept:
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+
 # === FastAPI App ===
 app = FastAPI(
     title=f"{APP_NAME} API with LangChain",
     description=f"Enhanced RAG (Retrieval-Augmented Generation) system with LangChain integration - {APP_NAME}",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(SSEAwareGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
 
 # === API Endpoints ===
 
@@ -430,22 +1091,20 @@ async def health_check():
         # Check MongoDB connection
         mongo_connected = True
         try:
-            mongo_client.admin.command('ping')
+            await async_mongo_client.admin.command('ping')
         except:
             mongo_connected = False
 
         # Check ChromaDB
-        chroma_available = os.path.exists("chroma_pdf_db")
-
-        # Count documents
-        total_docs = collection.count_documents({})
+        chroma_available = VECTORSTORE is not None or chroma_dir_exists()
 
-        # Count unique files
-        pipeline = [{"$group": {"_id": "$filename"}}]
-        unique_files = len(list(collection.aggregate(pipeline)))
+        # Count documents and unique files in one aggregation
+        stats = await async_collection.aggregate(STATS_PIPELINE).to_list(1)
+        stats = stats[0] if stats else {"files": 0, "docs": 0}
+        total_docs, unique_files = stats["docs"], stats["files"]
 
         # Check OpenAI configuration
-        openai_configured = bool(os.getenv("OPENAI_API_KEY"))
+        openai_configured = bool(OPENAI_API_KEY)
 
         status = "healthy" if all([
             mongo_connected, openai_configured, LANGCHAIN_AVAILABLE
@@ -479,83 +1138,144 @@ async def upload_pdf(
         # Create PDF folder if not exists
         os.makedirs(PDF_FOLDER, exist_ok=True)
 
-        # Save uploaded file
+        # Stream upload to disk in 1 MB chunks, hashing in the same pass
         file_path = os.path.join(PDF_FOLDER, file.filename)
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        partial_path = file_path + ".part"
+        hasher = hashlib.new(FILE_HASH_ALGORITHM)
+        size = 0
+        try:
+            async with aiofiles.open(partial_path, "wb") as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    await out.write(chunk)
+            os.replace(partial_path, file_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
 
         # Process file in background
-        background_tasks.add_task(process_pdf_file, file_path)
+        background_tasks.add_task(
+            process_pdf_file, file_path, hasher.hexdigest())
 
         return APIResponse(
             status="success",
             message=f"File {file.filename} uploaded successfully and is being processed",
-            data={"filename": file.filename, "size": len(content)}
+            data={"filename": file.filename, "size": size}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
 
 
-def process_pdf_file(file_path: str):
+async def process_pdf_file(file_path: str, file_hash: Optional[str] = None):
     """Background task to process PDF file"""
     try:
         filename = os.path.basename(file_path)
-        file_hash = get_file_hash(file_path)
+        file_hash = file_hash or await run_in_threadpool(get_file_hash, file_path)
 
         # Check if already processed
-        existing_doc = collection.find_one(
-            {"filename": filename, "file_hash": file_hash})
+        # Projection on indexed fields only: answered from the chunk index
+        existing_doc = await async_collection.find_one(
+            {"filename": filename, "file_hash": file_hash},
+            {"_id": 0, "file_hash": 1})
         if existing_doc:
             return
 
-        # Extract text
-        text = extract_text_from_pdf(file_path)
-        if not text.strip():
-            return
-
-        # Split into chunks
-        documents = split_text_into_chunks(text, filename)
+        cached_chunks = await load_cached_chunks(file_hash)
+        if cached_chunks:
+            # Same content seen before: reuse its chunks and embeddings
+            documents = [
+                {"text": chunk["text"], "chunk_id": chunk["chunk_id"],
+                 "source": "pdf", "chunk_size": len(chunk["text"])}
+                for chunk in cached_chunks
+            ]
+            embeddings = [chunk["embedding"] for chunk in cached_chunks]
+            print(f"♻️ Reusing {len(embeddings)} cached embeddings for {filename}")
+        else:
+            # Extract, chunk and embed as a pipeline
+            documents, embeddings = await embed_pdf_chunks(file_path, filename)
+            if not documents:
+                return
+            await store_cached_chunks(file_hash, documents, embeddings)
 
         # Process each chunk for MongoDB
+        mongo_docs = []
+        upload_date = datetime.now().isoformat()  # one timestamp per file
         texts_for_langchain = []
         metadatas_for_langchain = []
+        embeddings_for_langchain = []
 
-        for doc in documents:
-            embedding = get_embedding(doc["text"])
+        for doc, embedding in zip(documents, embeddings):
             if not embedding:
                 continue
 
             mongo_doc = {
-                "doc_id": f"{filename}_chunk_{doc['chunk_id']}",
+                # Content hash keeps a changed file's chunks from colliding with the old ones
+                "doc_id": f"{filename}_{file_hash[:16]}_chunk_{doc['chunk_id']}",
                 "filename": filename,
                 "file_hash": file_hash,
                 "text": doc["text"],
                 "chunk_id": doc["chunk_id"],
                 "source": doc["source"],
                 "chunk_size": doc["chunk_size"],
-                "embedding": embedding,
                 "kategori": "pdf_document",
-                "upload_date": datetime.now().isoformat()
+                "upload_date": upload_date
             }
+            if QUANTIZE_EMBEDDINGS:
+                mongo_doc.update(quantized_fields(embedding))
+            else:
+                mongo_doc["embedding"] = embedding
 
-            collection.insert_one(mongo_doc)
+            mongo_docs.append(mongo_doc)
 
             # Prepare for LangChain
             texts_for_langchain.append(doc["text"])
+            embeddings_for_langchain.append(embedding)
             metadatas_for_langchain.append({
                 "doc_id": mongo_doc["doc_id"],
                 "filename": filename,
                 "kategori": "pdf_document"
             })
 
+        # One round-trip for all chunks; duplicates from a concurrent upload
+        # of the same file are rejected by the unique index and skipped
+        if mongo_docs:
+            try:
+                await async_collection.insert_many(mongo_docs, ordered=False)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != DUPLICATE_KEY_ERROR for err in write_errors):
+                    raise
+                print(f"⚠️ Skipped {len(write_errors)} duplicate chunks of {filename}")
+
+                # Rejected chunks are already stored - keep them out of the index and Chroma
+                rejected = {err["index"] for err in write_errors}
+                keep = [i for i in range(len(mongo_docs)) if i not in rejected]
+                mongo_docs = [mongo_docs[i] for i in keep]
+                texts_for_langchain = [texts_for_langchain[i] for i in keep]
+                embeddings_for_langchain = [embeddings_for_langchain[i] for i in keep]
+                metadatas_for_langchain = [metadatas_for_langchain[i] for i in keep]
+
+        if mongo_docs:
+            if VECTOR_INDEX_ENABLED:
+                try:
+                    await run_in_threadpool(
+                        VECTOR_INDEX.add,
+                        [doc["doc_id"] for doc in mongo_docs],
+                        [filename] * len(mongo_docs),
+                        embeddings_for_langchain)
+                except Exception as e:
+                    print(f"⚠️ Failed to add {filename} to vector index: {e}")
+
         # Add to LangChain if available
         if langchain_rag and texts_for_langchain:
             try:
-                langchain_rag.add_documents(
-                    texts_for_langchain, metadatas_for_langchain)
+                await run_in_threadpool(
+                    langchain_rag.add_documents, texts_for_langchain,
+                    metadatas_for_langchain, embeddings_for_langchain)
                 print(
                     f"✅ Added {len(texts_for_langchain)} documents to LangChain system")
+                await run_in_threadpool(invalidate_answer_cache)
             except Exception as e:
                 print(f"⚠️ Failed to add documents to LangChain: {e}")
 
@@ -563,12 +1283,21 @@ def process_pdf_file(file_path: str):
         print(f"Error processing PDF: {e}")
 
 
+def prune_vectorstore(vectorstore: Chroma, doc_ids: List[str]):
+    """Delete Chroma entries that are not current chunks (random-ID duplicates, deleted files)"""
+    keep = set(doc_ids)
+    stale = [id_ for id_ in vectorstore.get(include=[])["ids"] if id_ not in keep]
+    if stale:
+        vectorstore.delete(ids=stale)
+        print(f"🧹 Removed {len(stale)} stale vector store entries")
+
+
 @app.post("/build-vectorstore", response_model=APIResponse)
 async def build_vectorstore():
     """Build ChromaDB vector store from processed documents"""
     try:
-        docs = list(collection.find(
-            {}, {"doc_id": 1, "text": 1, "filename": 1, "kategori": 1}))
+        docs = await async_collection.find(
+            {}, {"doc_id": 1, "text": 1, "filename": 1, "kategori": 1}).to_list(None)
         if not docs:
             raise HTTPException(
                 status_code=404, detail="No documents found in database")
@@ -582,23 +1311,32 @@ async def build_vectorstore():
             } for doc in docs
         ]
 
-        os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-        Chroma.from_texts(
+        # Upserts keyed by doc_id, so a rebuild replaces chunks instead of duplicating them
+        doc_ids = [doc["doc_id"] for doc in docs]
+        vectorstore = await run_in_threadpool(
+            Chroma.from_texts,
             texts,
-            embeddings,
+            EMBEDDINGS,
             metadatas=metadatas,
-            persist_directory="chroma_pdf_db"
+            ids=doc_ids,
+            persist_directory=CHROMA_DIR,
+            collection_metadata=CHROMA_COLLECTION_METADATA
         )
+        await run_in_threadpool(prune_vectorstore, vectorstore, doc_ids)
 
-        # Rebuild LangChain system
-        if langchain_rag:
+        if VECTOR_INDEX_ENABLED:
             try:
-                langchain_rag.add_documents(texts, metadatas)
-                print("✅ LangChain system updated with vector store")
+                await run_in_threadpool(load_vector_index)
+                print(f"✅ Vector index reloaded ({len(VECTOR_INDEX)} chunks)")
             except Exception as e:
-                print(f"⚠️ Failed to update LangChain system: {e}")
+                print(f"⚠️ Could not reload vector index: {e}")
+
+        # The store above already holds every chunk; LangChain only needs a handle
+        if langchain_rag:
+            if langchain_rag.vectorstore is None:
+                langchain_rag.vectorstore = vectorstore
+            print("✅ LangChain system updated with vector store")
+            await run_in_threadpool(invalidate_answer_cache)
 
         return APIResponse(
             status="success",
@@ -621,14 +1359,26 @@ async def ask_question(request: QuestionRequest):
 
         # Use LangChain system if available and requested
         if use_langchain and langchain_rag:
-            session_id = request.session_id or str(uuid.uuid4())
+            session_id = request.session_id or new_session_id()
+            cacheable = await run_in_threadpool(is_cacheable, session_id)
+            cached = await run_in_threadpool(
+                lookup_cached_answer, query, session_id, cacheable)
 
             if stream:
                 # LangChain streaming response
                 async def generate():
+                    response_task = None
+                    deadline = None
                     try:
                         # Send session_id first
-                        yield f"data: {json.dumps({'session_id': session_id, 'type': 'session'})}\n\n"
+                        yield sse_event({'session_id': session_id, 'type': 'session'})
+
+                        if cached:
+                            yield sse_token(cached['answer'])
+                            if cached["sources"]:
+                                yield sse_event({'sources': cached['sources'], 'type': 'source'})
+                            yield sse_event({'type': 'done', 'cache_hit': True})
+                            return
 
                         # Create streaming handler
                         handler = SimpleStreamingHandler()
@@ -639,38 +1389,65 @@ async def ask_question(request: QuestionRequest):
                                 query, session_id, handler)
                         )
 
-                        # Stream tokens
+                        # One timer per stream instead of a timeout per token
+                        deadline = asyncio.get_running_loop().call_later(
+                            STREAM_TIMEOUT, handler.tokens.put_nowait, STREAM_TIMEOUT_ERROR)
+
+                        # Stream tokens as soon as the callback queues them
                         while True:
-                            try:
-                                token = await asyncio.wait_for(handler.tokens.get(), timeout=1.0)
-                                if token is None:  # End of stream
-                                    break
-                                if token.startswith("Error:"):
-                                    yield f"data: {json.dumps({'error': token, 'type': 'error'})}\n\n"
-                                    break
-                                else:
-                                    yield f"data: {json.dumps({'token': token, 'type': 'content'})}\n\n"
-                            except asyncio.TimeoutError:
-                                continue
+                            token = await handler.tokens.get()
+                            if token is None:  # End of stream
+                                break
+                            if token is STREAM_TIMEOUT_ERROR:
+                                yield sse_event({'error': token, 'type': 'error'})
+                                return
+                            if token.startswith("Error:"):
+                                yield sse_event({'error': token, 'type': 'error'})
+                                break
+                            yield sse_token(token)
 
                         # Get final result
                         try:
                             result = await response_task
                             if result.get("sources"):
-                                yield f"data: {json.dumps({'sources': result['sources'], 'type': 'source'})}\n\n"
+                                yield sse_event({'sources': result['sources'], 'type': 'source'})
+                            if cacheable and result.get("documents"):
+                                await run_in_threadpool(
+                                    semantic_cache.store, query, result["answer"], result["sources"])
                         except Exception as e:
-                            yield f"data: {json.dumps({'error': str(e), 'type': 'error'})}\n\n"
+                            yield sse_event({'error': str(e), 'type': 'error'})
 
-                        yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                        yield SSE_DONE
 
                     except Exception as e:
-                        yield f"data: {json.dumps({'error': str(e), 'type': 'error'})}\n\n"
-
-                return EventSourceResponse(generate())
+                        yield sse_event({'error': str(e), 'type': 'error'})
+                    finally:
+                        if deadline is not None:
+                            deadline.cancel()
+                        # Stop generating if the client disconnected mid-stream
+                        if response_task is not None and not response_task.done():
+                            response_task.cancel()
+
+                return EventSourceResponse(generate(), headers=SSE_HEADERS)
             else:
                 # LangChain non-streaming response
-                session_id = request.session_id or str(uuid.uuid4())
-                result = await langchain_rag.ask_question(query, session_id)
+                if cached:
+                    return QuestionResponse(
+                        question=query,
+                        answer=cached["answer"],
+                        sources=cached["sources"],
+                        timestamp=datetime.now().isoformat(),
+                        session_id=session_id,
+                        cache_hit=True
+                    )
+
+                if await run_in_threadpool(langchain_rag.has_history, session_id):
+                    result = await langchain_rag.ask_question(query, session_id)
+                else:
+                    result = await ask_langchain_once(request, session_id)
+                if cacheable and result.get("documents"):
+                    await run_in_threadpool(
+                        semantic_cache.store, query, result["answer"], result["sources"])
 
                 return QuestionResponse(
                     question=query,
@@ -698,7 +1475,7 @@ async def ask_question_legacy(request: QuestionRequest):
         stream = request.stream
 
         # Get or create session
-        session_id, conversation_manager = session_manager.get_or_create_session(
+        session_id, conversation_manager = await session_manager.open_session(
             request.session_id)
 
         # Get conversation context
@@ -707,13 +1484,7 @@ async def ask_question_legacy(request: QuestionRequest):
         # Enhanced query with conversation context
         enhanced_query = query
         if conversation_context:
-            follow_up_indicators = [
-                "lanjut", "selanjutnya", "lebih detail", "contoh", "bagaimana",
-                "jelaskan lebih", "detail", "itu", "tersebut", "tadi", "sebelumnya"
-            ]
-
-            is_follow_up = any(indicator in query.lower()
-                               for indicator in follow_up_indicators)
+            is_follow_up = FOLLOW_UP_RE.search(query) is not None
 
             if is_follow_up:
                 last_question = conversation_manager.conversation_history[-1][
@@ -721,19 +1492,20 @@ async def ask_question_legacy(request: QuestionRequest):
                 enhanced_query = f"Berdasarkan pertanyaan sebelumnya '{last_question}', {query}"
 
         # Search similar documents
-        results = search_similar_documents(
-            enhanced_query, top_k, filename_filter)
+        results = await run_in_threadpool(
+            search_similar_documents, enhanced_query, top_k, filename_filter)
 
         if not results:
             answer = "Tidak ada dokumen relevan ditemukan untuk pertanyaan Anda."
-            conversation_manager.add_exchange(query, answer, [])
+            await session_manager.record_exchange(
+                session_id, conversation_manager, query, answer, [])
 
             if stream:
                 def generate():
-                    yield f"data: {json.dumps({'session_id': session_id, 'type': 'session'})}\n\n"
-                    yield f"data: {json.dumps({'token': answer, 'type': 'content'})}\n\n"
-                    yield f"data: {json.dumps({'type': 'done'})}\n\n"
-                return EventSourceResponse(generate())
+                    yield sse_event({'session_id': session_id, 'type': 'session'})
+                    yield sse_token(answer)
+                    yield SSE_DONE
+                return EventSourceResponse(generate(), headers=SSE_HEADERS)
             else:
                 return QuestionResponse(
                     question=query,
@@ -745,7 +1517,9 @@ async def ask_question_legacy(request: QuestionRequest):
 
         # Get full documents from MongoDB
         doc_ids = [res.metadata["doc_id"] for res in results]
-        full_docs = list(collection.find({"doc_id": {"$in": doc_ids}}))
+        full_docs = await async_collection.find(
+            {"doc_id": {"$in": doc_ids}},
+            {"_id": 0, "filename": 1, "text": 1}).to_list(None)
 
         # Prepare context
         context_parts = []
@@ -784,12 +1558,12 @@ async def ask_question_legacy(request: QuestionRequest):
 
         if stream:
             # Streaming response
-            def generate():
+            async def generate():
                 try:
                     # Send session_id first
-                    yield f"data: {json.dumps({'session_id': session_id, 'type': 'session'})}\n\n"
+                    yield sse_event({'session_id': session_id, 'type': 'session'})
 
-                    response_stream = client_openai.chat.completions.create(
+                    response_stream = await async_client_openai.chat.completions.create(
                         model=MODEL_NAME,
                         messages=[{"role": "user", "content": full_prompt}],
                         temperature=MODEL_TEMPERATURE,
@@ -798,30 +1572,31 @@ async def ask_question_legacy(request: QuestionRequest):
                     )
 
                     full_answer = ""
-                    for chunk in response_stream:
+                    async for chunk in response_stream:
                         if chunk.choices[0].delta.content:
                             token = chunk.choices[0].delta.content
                             full_answer += token
-                            yield f"data: {json.dumps({'token': token, 'type': 'content'})}\n\n"
+                            yield sse_token(token)
 
                     # Send sources
                     sources = list(source_files)
                     if sources:
-                        yield f"data: {json.dumps({'sources': sources, 'type': 'source'})}\n\n"
+                        yield sse_event({'sources': sources, 'type': 'source'})
 
                     # Store in conversation history
-                    conversation_manager.add_exchange(
-                        query, full_answer, sources)
+                    await session_manager.record_exchange(
+                        session_id, conversation_manager, query, full_answer, sources)
 
-                    yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                    yield SSE_DONE
 
                 except Exception as e:
-                    yield f"data: {json.dumps({'error': str(e), 'type': 'error'})}\n\n"
+                    yield sse_event({'error': str(e), 'type': 'error'})
 
-            return EventSourceResponse(generate())
+            return EventSourceResponse(generate(), headers=SSE_HEADERS)
         else:
             # Non-streaming response
-            response = client_openai.chat.completions.create(
+            response = await run_in_threadpool(
+                client_openai.chat.completions.create,
                 model=MODEL_NAME,
                 messages=[{"role": "user", "content": full_prompt}],
                 temperature=MODEL_TEMPERATURE,
@@ -832,7 +1607,8 @@ async def ask_question_legacy(request: QuestionRequest):
             sources = list(source_files)
 
             # Store in conversation history
-            conversation_manager.add_exchange(query, answer, sources)
+            await session_manager.record_exchange(
+                session_id, conversation_manager, query, answer, sources)
 
             return QuestionResponse(
                 question=query,
@@ -857,8 +1633,24 @@ async def ask_langchain_question(request: QuestionRequest):
         )
 
     try:
-        session_id = request.session_id or str(uuid.uuid4())
+        session_id = request.session_id or new_session_id()
+        cacheable = await run_in_threadpool(is_cacheable, session_id)
+        cached = await run_in_threadpool(
+            lookup_cached_answer, request.question, session_id, cacheable)
+        if cached:
+            return QuestionResponse(
+                question=request.question,
+                answer=cached["answer"],
+                sources=cached["sources"],
+                timestamp=datetime.now().isoformat(),
+                session_id=session_id,
+                cache_hit=True
+            )
+
         result = await langchain_rag.ask_question(request.question, session_id)
+        if cacheable and result.get("documents"):
+            await run_in_threadpool(
+                semantic_cache.store, request.question, result["answer"], result["sources"])
 
         return QuestionResponse(
             question=request.question,
@@ -884,13 +1676,13 @@ async def ask_agent_question(request: QuestionRequest):
         )
 
     try:
-        session_id = request.session_id or str(uuid.uuid4())
+        session_id = request.session_id or new_session_id()
 
         # Use the same ask_question method since we simplified the system
         result = await langchain_rag.ask_question(request.question, session_id)
 
         # Add file search information
-        files_info = langchain_rag.search_files()
+        files_info = await run_in_threadpool(langchain_rag.search_files)
         enhanced_answer = f"{result['answer']}\n\n--- Files Information ---\n{files_info}"
 
         return QuestionResponse(
@@ -912,6 +1704,7 @@ async def list_files():
     """List all processed PDF files"""
     try:
         pipeline = [
+            {"$project": {"_id": 0, "filename": 1, "file_hash": 1, "upload_date": 1}},
             {"$group": {
                 "_id": "$filename",
                 "chunks": {"$sum": 1},
@@ -921,7 +1714,7 @@ async def list_files():
             {"$sort": {"_id": 1}}
         ]
 
-        files = list(collection.aggregate(pipeline))
+        files = await async_collection.aggregate(pipeline).to_list(None)
 
         return [
             FileInfo(
@@ -941,8 +1734,10 @@ async def list_files():
 async def delete_file(filename: str):
     """Delete a specific file and all its chunks"""
     try:
-        result = collection.delete_many({"filename": filename})
+        result = await async_collection.delete_many({"filename": filename})
         if result.deleted_count > 0:
+            await run_in_threadpool(VECTOR_INDEX.remove_filename, filename)
+            await run_in_threadpool(invalidate_answer_cache)
             return APIResponse(
                 status="success",
                 message=f"File {filename} deleted successfully",
@@ -957,7 +1752,7 @@ async def delete_file(filename: str):
 
 
 @app.get("/search", response_model=List[SearchResult])
-async def search_documents(
+def search_documents(
     query: str = Query(..., description="Search query"),
     top_k: int = Query(
         5, description="Number of results to return", ge=1, le=20),
@@ -988,7 +1783,7 @@ async def get_conversation_history(session_id: str):
     # Try LangChain first
     if LANGCHAIN_AVAILABLE and langchain_rag:
         try:
-            history = langchain_rag.get_conversation_history(session_id)
+            history = await run_in_threadpool(langchain_rag.get_conversation_history, session_id)
             return ConversationHistory(
                 session_id=session_id,
                 history=history,
@@ -998,7 +1793,7 @@ async def get_conversation_history(session_id: str):
             print(f"LangChain history retrieval failed: {e}")
 
     # Fallback to legacy system
-    conversation_manager = session_manager.get_session(session_id)
+    conversation_manager = await session_manager.load_session(session_id)
     if not conversation_manager:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -1015,7 +1810,7 @@ async def clear_conversation_history(session_id: str):
 
     # Try LangChain first
     if LANGCHAIN_AVAILABLE and langchain_rag:
-        success = langchain_rag.clear_conversation_history(session_id)
+        success = await run_in_threadpool(langchain_rag.clear_conversation_history, session_id)
         if success:
             return APIResponse(
                 status="success",
@@ -1024,7 +1819,7 @@ async def clear_conversation_history(session_id: str):
             )
 
     # Fallback to legacy system
-    if session_manager.delete_session(session_id):
+    if await session_manager.remove_session(session_id):
         return APIResponse(
             status="success",
             message="Legacy session cleared successfully",
@@ -1039,9 +1834,10 @@ async def configure_conversation(session_id: str, request: ConversationContextRe
     """Configure conversation context window for a specific session"""
     try:
         # For legacy system
-        conversation_manager = session_manager.get_session(session_id)
+        conversation_manager = await session_manager.load_session(session_id)
         if conversation_manager:
-            conversation_manager.context_window = request.context_window
+            await session_manager.configure_session(
+                session_id, conversation_manager, request.context_window)
             return APIResponse(
                 status="success",
                 message=f"Legacy conversation context window set to {request.context_window}",
@@ -1061,54 +1857,58 @@ async def configure_conversation(session_id: str, request: ConversationContextRe
             status_code=500, detail=f"Configuration failed: {e}")
 
 
-@app.get("/conversation/export/{session_id}", response_class=FileResponse)
+def iter_json_export(header: Dict[str, Any], history: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Serialize an export one exchange at a time: header fields, history array, total"""
+    yield orjson.dumps(header)[:-1] + b',"history":['
+    total = 0
+    for exchange in history:
+        yield (b"," if total else b"") + orjson.dumps(exchange)
+        total += 1
+    yield b'],"total_exchanges":' + str(total).encode() + b"}"
+
+
+def export_response(header: Dict[str, Any], history: Iterable[Dict[str, Any]], filename: str) -> StreamingResponse:
+    """Stream a conversation export as a JSON attachment"""
+    return StreamingResponse(
+        iter_json_export(header, history),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.get("/conversation/export/{session_id}")
 async def export_conversation(session_id: str):
     """Export conversation history as JSON file for a specific session"""
     try:
         # Try LangChain first
         if LANGCHAIN_AVAILABLE and langchain_rag:
             try:
-                conversation_data = langchain_rag.export_conversation(
-                    session_id)
-                if conversation_data["history"]:  # Has history
-                    filename = f"langchain_conversation_{session_id}.json"
-                    filepath = f"/tmp/{filename}"
-
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(conversation_data, f,
-                                  indent=2, ensure_ascii=False)
-
-                    return FileResponse(
-                        filepath,
-                        media_type='application/json',
-                        filename=filename
+                history = langchain_rag.iter_conversation_history(session_id)
+                first = await run_in_threadpool(next, history, None)
+                if first is not None:  # Has history
+                    return export_response(
+                        {"session_id": session_id,
+                         "exported_at": datetime.now().isoformat()},
+                        itertools.chain([first], history),
+                        f"langchain_conversation_{session_id}.json"
                     )
             except Exception as e:
                 print(f"LangChain export failed: {e}")
 
         # Fallback to legacy system
-        conversation_manager = session_manager.get_session(session_id)
+        conversation_manager = await session_manager.load_session(session_id)
         if not conversation_manager:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        filename = f"legacy_conversation_{session_id}.json"
-        filepath = f"/tmp/{filename}"
-
-        conversation_data = {
-            "session_id": session_id,
-            "history": conversation_manager.conversation_history,
-            "exported_at": datetime.now().isoformat(),
-            "system": "legacy"
-        }
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(conversation_data, f, indent=2, ensure_ascii=False)
-
-        return FileResponse(
-            filepath,
-            media_type='application/json',
-            filename=filename
+        return export_response(
+            {"session_id": session_id,
+             "exported_at": datetime.now().isoformat(),
+             "system": "legacy"},
+            tuple(conversation_manager.conversation_history),
+            f"legacy_conversation_{session_id}.json"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {e}")
 
@@ -1130,12 +1930,12 @@ async def list_sessions():
 
     # LangChain sessions
     if LANGCHAIN_AVAILABLE and langchain_rag:
+        exchange_counts = langchain_rag.exchange_counts()
         for session_id in langchain_rag.memories.keys():
-            history = langchain_rag.get_conversation_history(session_id)
             sessions_info.append({
                 "session_id": session_id,
                 "last_activity": datetime.now().isoformat(),  # Simplified
-                "total_exchanges": len(history),
+                "total_exchanges": exchange_counts.get(session_id, 0),
                 "system": "langchain"
             })
 
@@ -1146,53 +1946,15 @@ async def list_sessions():
     )
 
 
-# === Startup Event ===
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize application on startup"""
-    print(f"🚀 {APP_NAME} API with LangChain starting up...")
-
-    # Create PDF folder
-    os.makedirs(PDF_FOLDER, exist_ok=True)
-    print(f"📁 PDF folder ready: {PDF_FOLDER}")
-
-    # Test MongoDB connection
-    try:
-        mongo_client.admin.command('ping')
-        print("✅ MongoDB connection successful")
-    except Exception as e:
-        print(f"❌ MongoDB connection failed: {e}")
-
-    # Check OpenAI configuration
-    if os.getenv("OPENAI_API_KEY"):
-        print("✅ OpenAI API key configured")
-    else:
-        print("⚠️ OpenAI API key not found")
-
-    # Check LangChain system
-    if LANGCHAIN_AVAILABLE:
-        print("✅ LangChain RAG system ready")
-    else:
-        print("⚠️ LangChain RAG system not available - using legacy system")
-
-    print(f"🎉 {APP_NAME} API ready!")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    print(f"🛑 {APP_NAME} API shutting down...")
-    if mongo_client:
-        mongo_client.close()
-        print("🔌 MongoDB connection closed")
-
 # === Main ===
 if __name__ == "__main__":
     uvicorn.run(
         "api_langchain:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        workers=API_WORKERS,
+        reload=API_RELOAD and API_WORKERS == 1,
         log_level="info"
     )
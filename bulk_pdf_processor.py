@@ -8,27 +8,55 @@ Usage:
     python bulk_pdf_processor.py --folder custom_folder
     python bulk_pdf_processor.py --dry-run
     python bulk_pdf_processor.py --force
+    python bulk_pdf_processor.py --copy
 """
 
 import os
 import sys
 import argparse
+import logging
 import shutil
-from pathlib import Path
+import time
+import random
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import DeleteMany, InsertOne
+from pymongo.errors import BulkWriteError
 
 # Import dari api.py
 from api import (
     APP_NAME,
+    mongo_client,
     collection,
-    extract_text_from_pdf,
-    split_text_into_chunks,
+    ensure_indexes,
+    iter_pdf_pages,
+    iter_text_chunks,
     get_embedding,
     get_file_hash,
-    PDF_FOLDER
+    make_doc_id,
+    quantized_fields,
+    PDF_FOLDER,
+    QUANTIZE_EMBEDDINGS
 )
 
+# Chunks per insert_many call; keeps each batch well under the 16MB BSON limit
+INSERT_BATCH_SIZE = 500
+# MongoDB write error code for a unique index violation
+DUPLICATE_KEY_ERROR = 11000
+# Embedding requests in flight across all worker processes, split evenly
+# between them; keeps the bulk run within typical OpenAI rate limits
+EMBED_MAX_IN_FLIGHT = int(os.getenv("BULK_EMBED_MAX_IN_FLIGHT", "16"))
+# PDFs processed in parallel, each in its own process (extraction is CPU-bound)
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# Embedding requests in flight per PDF (network-bound, so threads are enough)
+DEFAULT_CONCURRENCY = max(1, EMBED_MAX_IN_FLIGHT // DEFAULT_WORKERS)
+# Retries per embedding request (429s, timeouts), backing off 1s, 2s, 4s, ...
+EMBED_RETRIES = 5
+EMBED_RETRY_BASE_DELAY = 1.0
+
 class Colors:
     """ANSI color codes untuk output terminal"""
     RED = '\033[91m'
@@ -41,55 +69,77 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
-def log_info(message: str):
-    """Log info message"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Colors.BLUE}[INFO {timestamp}]{Colors.END} {message}")
+SUCCESS = 25  # between INFO and WARNING
+logging.addLevelName(SUCCESS, "SUCCESS")
 
-def log_success(message: str):
-    """Log success message"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Colors.GREEN}[SUCCESS {timestamp}]{Colors.END} {message}")
+class ColorFormatter(logging.Formatter):
+    """Colored level prefix, one prebuilt formatter per level"""
+    LEVEL_COLORS = {
+        logging.DEBUG: Colors.CYAN,
+        logging.INFO: Colors.BLUE,
+        SUCCESS: Colors.GREEN,
+        logging.WARNING: Colors.YELLOW,
+        logging.ERROR: Colors.RED,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.formatters = {
+            level: logging.Formatter(
+                f"{color}[{logging.getLevelName(level)} %(asctime)s]{Colors.END} %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S")
+            for level, color in self.LEVEL_COLORS.items()
+        }
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.formatters.get(record.levelno, self.formatters[logging.ERROR]).format(record)
+
+def setup_logger() -> logging.Logger:
+    """Logger to stderr; BULK_LOG_LEVEL is read here so spawned workers inherit it"""
+    logger = logging.getLogger("bulk")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(ColorFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(os.getenv("BULK_LOG_LEVEL", "INFO").upper())
+    return logger
 
-def log_warning(message: str):
-    """Log warning message"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Colors.YELLOW}[WARNING {timestamp}]{Colors.END} {message}")
+logger = setup_logger()
+log_debug = logger.debug
+log_info = logger.info
+log_warning = logger.warning
+log_error = logger.error
 
-def log_error(message: str):
-    """Log error message"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{Colors.RED}[ERROR {timestamp}]{Colors.END} {message}")
+def log_success(message: str):
+    """Log success message"""
+    logger.log(SUCCESS, message)
 
 def get_pdf_files(folder: str) -> List[str]:
     """Mendapatkan daftar file PDF dalam folder"""
-    pdf_files: List[str] = []
-    folder_path = Path(folder)
-    
-    if not folder_path.exists():
+    if not os.path.isdir(folder):
         log_error(f"Folder {folder} tidak ditemukan!")
-        return pdf_files
-    
-    for file_path in folder_path.glob("*.pdf"):
-        if file_path.is_file():
-            pdf_files.append(str(file_path))
+        return []
     
-    # Juga cari file PDF dengan ekstensi uppercase
-    for file_path in folder_path.glob("*.PDF"):
-        if file_path.is_file():
-            pdf_files.append(str(file_path))
+    # Satu kali scan; ekstensi dicek case-insensitive (.pdf, .PDF, .Pdf, ...)
+    with os.scandir(folder) as entries:
+        pdf_files = [entry.path for entry in entries
+                     if entry.name.lower().endswith(".pdf") and entry.is_file()]
     
     return sorted(pdf_files)
 
-def is_pdf_processed(file_path: str) -> Tuple[bool, str]:
+def is_pdf_processed(file_path: str, file_hash: Optional[str] = None) -> Tuple[bool, str]:
     """Cek apakah PDF sudah diproses"""
     filename = os.path.basename(file_path)
-    file_hash = get_file_hash(file_path)
+    if file_hash is None:
+        file_hash = get_file_hash(file_path)
     
-    existing_doc = collection.find_one({
-        "filename": filename, 
-        "file_hash": file_hash
-    })
+    # Only upload_date is needed - skip the chunk text and embedding
+    existing_doc = collection.find_one(
+        {"filename": filename, "file_hash": file_hash},
+        projection={"upload_date": 1, "_id": 0},
+        hint=[("filename", 1), ("file_hash", 1)]
+    )
     
     if existing_doc:
         upload_date = existing_doc.get("upload_date", "Unknown")
@@ -97,73 +147,181 @@ def is_pdf_processed(file_path: str) -> Tuple[bool, str]:
     
     return False, ""
 
-def process_single_pdf(file_path: str, force: bool = False) -> bool:
+def hash_files(pdf_files: List[str]) -> Dict[str, str]:
+    """Hash files in parallel (hashlib releases the GIL), skipping unreadable ones"""
+    def hash_one(file_path: str) -> Optional[str]:
+        try:
+            return get_file_hash(file_path)
+        except OSError as e:
+            log_error(f"📄 {os.path.basename(file_path)} - Gagal membaca file: {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=min(8, DEFAULT_WORKERS)) as executor:
+        hashes = executor.map(hash_one, pdf_files)
+    return {fp: h for fp, h in zip(pdf_files, hashes) if h is not None}
+
+def get_processed_map(file_hashes: Dict[str, str]) -> Dict[Tuple[str, str], str]:
+    """(filename, file_hash) -> upload_date for every already processed file, in one query per 500 files"""
+    pairs = [{"filename": os.path.basename(fp), "file_hash": h} for fp, h in file_hashes.items()]
+    processed_map: Dict[Tuple[str, str], str] = {}
+    for start in range(0, len(pairs), INSERT_BATCH_SIZE):
+        for row in collection.aggregate([
+            {"$match": {"$or": pairs[start:start + INSERT_BATCH_SIZE]}},
+            {"$group": {
+                "_id": {"filename": "$filename", "file_hash": "$file_hash"},
+                "upload_date": {"$first": "$upload_date"}
+            }}
+        ]):
+            key = (row["_id"]["filename"], row["_id"]["file_hash"])
+            processed_map[key] = row.get("upload_date") or "Unknown"
+    return processed_map
+
+def insert_chunks(mongo_docs: List[dict]) -> int:
+    """Insert chunk documents in one round-trip, returning how many were stored (duplicates are skipped)"""
+    if not mongo_docs:
+        return 0
+    try:
+        return len(collection.insert_many(mongo_docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nInserted", 0)
+
+def replace_chunks(filename: str, file_hash: str, mongo_docs: List[dict]) -> int:
+    """Swap a file's old chunks for new ones in one bulk write, transactional on replica sets"""
+    if not mongo_docs:
+        raise ValueError(f"Tidak ada chunk baru untuk menggantikan {filename}")
+    ops = [DeleteMany({"filename": filename, "file_hash": file_hash})]
+    ops.extend(InsertOne(doc) for doc in mongo_docs)
+    
+    topology = mongo_client.topology_description.topology_type_name
+    if topology in ("ReplicaSetWithPrimary", "Sharded"):
+        with mongo_client.start_session() as session:
+            result = session.with_transaction(
+                lambda s: collection.bulk_write(ops, ordered=True, session=s))
+    else:
+        # Standalone servers have no transactions; still a single round-trip
+        result = collection.bulk_write(ops, ordered=True)
+    return result.inserted_count
+
+def store_pdf(file_path: str, destination: str) -> bool:
+    """Place file at destination via hardlink, copying only across filesystems"""
+    if os.path.exists(destination):
+        if os.path.samefile(file_path, destination):
+            return False  # already there
+        os.remove(destination)
+    try:
+        os.link(file_path, destination)
+    except OSError:
+        # copyfile uses sendfile on Linux, so no userspace buffering
+        shutil.copyfile(file_path, destination)
+    return True
+
+def embed_chunk(text: str) -> Optional[List[float]]:
+    """Embedding for one chunk with jittered exponential backoff, None once retries run out"""
+    for attempt in range(EMBED_RETRIES + 1):
+        try:
+            return get_embedding(text)
+        except Exception as e:
+            if attempt == EMBED_RETRIES:
+                log_warning(f"{e}")
+                return None
+            delay = EMBED_RETRY_BASE_DELAY * 2 ** attempt
+            log_debug(f"Embedding gagal ({e}), coba lagi dalam {delay:.0f} detik")
+            time.sleep(delay + random.uniform(0, delay))
+
+def process_single_pdf(file_path: str, force: bool = False,
+                       concurrency: int = DEFAULT_CONCURRENCY,
+                       file_hash: Optional[str] = None,
+                       status: Optional[Tuple[bool, str]] = None,
+                       copy_to_folder: bool = False) -> bool:
     """Memproses satu file PDF"""
     try:
         filename = os.path.basename(file_path)
+        if file_hash is None:
+            file_hash = get_file_hash(file_path)
         
-        # Cek apakah sudah diproses
-        processed, upload_date = is_pdf_processed(file_path)
+        # Cek apakah sudah diproses (kecuali status sudah diketahui pemanggil)
+        processed, upload_date = status or is_pdf_processed(file_path, file_hash)
         if processed and not force:
             log_info(f"📄 {filename} - Sudah diproses pada {upload_date} (skip)")
             return True
         
-        if processed and force:
+        # Data lama diganti sekaligus setelah chunk baru siap
+        replace_existing = processed and force
+        if replace_existing:
             log_info(f"📄 {filename} - Force reprocessing (sudah diproses pada {upload_date})")
-            # Hapus data lama
-            file_hash = get_file_hash(file_path)
-            collection.delete_many({
-                "filename": filename, 
-                "file_hash": file_hash
-            })
         
-        log_info(f"📄 {filename} - Mulai memproses...")
+        log_debug(f"📄 {filename} - Mulai memproses...")
         
-        # Copy file ke PDF_FOLDER jika belum ada
+        # Copy file ke PDF_FOLDER jika diminta; default diproses langsung dari sumber
+        source_path = os.path.abspath(file_path)
         destination = os.path.join(PDF_FOLDER, filename)
-        if not os.path.exists(destination) or force:
+        if copy_to_folder and (not os.path.exists(destination) or force):
             os.makedirs(PDF_FOLDER, exist_ok=True)
-            shutil.copy2(file_path, destination)
-            log_info(f"📄 {filename} - File disalin ke {PDF_FOLDER}")
+            if store_pdf(file_path, destination):
+                log_debug(f"📄 {filename} - File disalin ke {PDF_FOLDER}")
         
-        # Proses PDF
-        file_hash = get_file_hash(file_path)
+        # Extract page by page and embed each chunk as soon as it is cut,
+        # so later pages are read while earlier chunks are being embedded
+        documents = []
+        futures = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for doc in iter_text_chunks(iter_pdf_pages(file_path), filename):
+                documents.append(doc)
+                futures.append(executor.submit(embed_chunk, doc["text"]))
+            embeddings = [future.result() for future in futures]
         
-        # Extract text
-        text = extract_text_from_pdf(file_path)
-        if not text.strip():
+        if not documents:
             log_warning(f"📄 {filename} - Tidak ada teks yang dapat diekstrak")
             return False
         
-        log_info(f"📄 {filename} - Teks diekstrak ({len(text)} karakter)")
+        log_debug(f"📄 {filename} - Dibagi menjadi {len(documents)} chunk")
+        total_chunks = len(documents)
         
-        # Split into chunks
-        documents = split_text_into_chunks(text, filename)
-        log_info(f"📄 {filename} - Dibagi menjadi {len(documents)} chunk")
+        # Semua chunk harus punya embedding; file tidak pernah disimpan sebagian
+        # dan chunk lama (--force) dibiarkan utuh
+        missing = sum(1 for embedding in embeddings if not embedding)
+        if missing:
+            log_error(f"📄 {filename} - Gagal: embedding {missing} dari {total_chunks} chunk tidak dapat dibuat")
+            return False
         
         # Process each chunk
         processed_chunks = 0
-        for doc in documents:
-            embedding = get_embedding(doc["text"])
-            if not embedding:
-                log_warning(f"📄 {filename} - Gagal membuat embedding untuk chunk {doc['chunk_id']}")
-                continue
-            
+        mongo_docs = []
+        upload_ts = datetime.now().isoformat()  # one timestamp per file
+        for doc, embedding in zip(documents, embeddings):
             mongo_doc = {
-                "doc_id": f"{filename}_chunk_{doc['chunk_id']}",
+                "doc_id": make_doc_id(filename, file_hash, doc['chunk_id']),
                 "filename": filename,
                 "file_hash": file_hash,
                 "text": doc["text"],
                 "chunk_id": doc["chunk_id"],
                 "source": doc["source"],
                 "chunk_size": doc["chunk_size"],
-                "embedding": embedding,
                 "kategori": "pdf_document",
-                "upload_date": datetime.now().isoformat()
+                "upload_date": upload_ts
             }
+            if not copy_to_folder:
+                mongo_doc["source_path"] = source_path
+            if QUANTIZE_EMBEDDINGS:
+                mongo_doc.update(quantized_fields(embedding))
+            else:
+                mongo_doc["embedding"] = embedding
             
-            collection.insert_one(mongo_doc)
-            processed_chunks += 1
+            mongo_docs.append(mongo_doc)
+            if len(mongo_docs) >= INSERT_BATCH_SIZE and not replace_existing:
+                processed_chunks += insert_chunks(mongo_docs)
+                mongo_docs = []
+        
+        if replace_existing:
+            processed_chunks += replace_chunks(filename, file_hash, mongo_docs)
+        else:
+            processed_chunks += insert_chunks(mongo_docs)
+        
+        if total_chunks and not processed_chunks:
+            log_error(f"📄 {filename} - Gagal: 0 dari {total_chunks} chunk tersimpan")
+            return False
         
         log_success(f"📄 {filename} - Selesai diproses ({processed_chunks} chunk disimpan)")
         return True
@@ -172,15 +330,18 @@ def process_single_pdf(file_path: str, force: bool = False) -> bool:
         log_error(f"📄 {os.path.basename(file_path)} - Error: {e}")
         return False
 
-def bulk_process_pdfs(folder: str, dry_run: bool = False, force: bool = False):
+def bulk_process_pdfs(folder: str, dry_run: bool = False, force: bool = False,
+                      concurrency: int = DEFAULT_CONCURRENCY, workers: int = DEFAULT_WORKERS,
+                      copy_to_folder: bool = False):
     """Memproses semua PDF dalam folder secara bulk"""
     
     log_info(f"🚀 Memulai bulk processing PDF dari folder: {folder}")
     
     # Cek koneksi database
     try:
-        collection.find_one()
+        mongo_client.admin.command('ping')
         log_success("✅ Koneksi database berhasil")
+        ensure_indexes()
     except Exception as e:
         log_error(f"❌ Koneksi database gagal: {e}")
         return
@@ -207,7 +368,20 @@ def bulk_process_pdfs(folder: str, dry_run: bool = False, force: bool = False):
         "already_processed": 0
     }
     
+    # Hash semua file paralel, lalu cek status semua file sekaligus
+    file_hashes = hash_files(pdf_files)
+    try:
+        processed_map = get_processed_map(file_hashes)
+    except Exception as e:
+        log_error(f"❌ Gagal mengecek status file: {e}")
+        return
+    
+    def get_status(file_path: str) -> Tuple[bool, str]:
+        upload_date = processed_map.get((os.path.basename(file_path), file_hashes[file_path]))
+        return upload_date is not None, upload_date or ""
+    
     # Proses setiap file
+    pending: List[str] = []
     for i, file_path in enumerate(pdf_files, 1):
         filename = os.path.basename(file_path)
         
@@ -215,9 +389,13 @@ def bulk_process_pdfs(folder: str, dry_run: bool = False, force: bool = False):
         print(f"{Colors.BOLD}[{i}/{len(pdf_files)}] {filename}{Colors.END}")
         print(f"{Colors.CYAN}{'='*60}{Colors.END}")
         
+        if file_path not in file_hashes:
+            stats["failed"] += 1
+            continue
+        
         if dry_run:
             # Mode dry run - hanya tampilkan info
-            processed, upload_date = is_pdf_processed(file_path)
+            processed, upload_date = get_status(file_path)
             file_size = os.path.getsize(file_path) / (1024*1024)  # MB
             
             print(f"📄 File: {filename}")
@@ -230,8 +408,8 @@ def bulk_process_pdfs(folder: str, dry_run: bool = False, force: bool = False):
         
         # Proses file
         try:
-            # Cek status
-            processed, upload_date = is_pdf_processed(file_path)
+            # Cek status (hash dan status diteruskan ke worker)
+            processed, upload_date = get_status(file_path)
             
             if processed and not force:
                 stats["already_processed"] += 1
@@ -239,21 +417,53 @@ def bulk_process_pdfs(folder: str, dry_run: bool = False, force: bool = False):
                 log_info(f"📄 {filename} - Sudah diproses, skip")
                 continue
             
-            # Proses file
-            success = process_single_pdf(file_path, force)
-            
-            if success:
-                stats["processed"] += 1
-            else:
-                stats["failed"] += 1
+            pending.append(file_path)
                 
         except KeyboardInterrupt:
             log_warning("\n⚠️  Proses dihentikan oleh user")
+            pending.clear()
             break
         except Exception as e:
             log_error(f"📄 {filename} - Unexpected error: {e}")
             stats["failed"] += 1
     
+    # Proses file yang belum diproses, paralel antar proses
+    if pending:
+        log_info(f"⚙️  Memproses {len(pending)} file dengan {min(workers, len(pending))} worker")
+    
+    if pending and workers > 1:
+        # spawn: each worker opens its own MongoDB client instead of inheriting a forked one
+        with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)),
+                mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {
+                executor.submit(process_single_pdf, file_path, force, concurrency,
+                                file_hashes[file_path], get_status(file_path),
+                                copy_to_folder): file_path
+                for file_path in pending
+            }
+            try:
+                for future in as_completed(futures):
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        log_error(f"📄 {os.path.basename(futures[future])} - Unexpected error: {e}")
+                        success = False
+                    stats["processed" if success else "failed"] += 1
+            except KeyboardInterrupt:
+                log_warning("\n⚠️  Proses dihentikan oleh user")
+                executor.shutdown(wait=False, cancel_futures=True)
+    else:
+        for file_path in pending:
+            try:
+                success = process_single_pdf(file_path, force, concurrency,
+                                             file_hashes[file_path], get_status(file_path),
+                                             copy_to_folder)
+            except KeyboardInterrupt:
+                log_warning("\n⚠️  Proses dihentikan oleh user")
+                break
+            stats["processed" if success else "failed"] += 1
+    
     # Tampilkan statistik final
     print(f"\n{Colors.MAGENTA}{'='*60}{Colors.END}")
     print(f"{Colors.BOLD}📊 STATISTIK PROCESSING{Colors.END}")
@@ -278,6 +488,7 @@ Contoh penggunaan:
   python bulk_pdf_processor.py --folder docs      # Proses folder docs
   python bulk_pdf_processor.py --dry-run          # Preview tanpa memproses
   python bulk_pdf_processor.py --force            # Proses ulang file yang sudah ada
+  python bulk_pdf_processor.py --copy             # Salin juga PDF ke pdf_documents
         """
     )
     
@@ -299,8 +510,41 @@ Contoh penggunaan:
         help="Force reprocess file yang sudah diproses sebelumnya"
     )
     
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help=f"Jumlah request embedding paralel per PDF "
+             f"(default: {EMBED_MAX_IN_FLIGHT} dibagi jumlah worker)"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Jumlah PDF yang diproses paralel (default: {DEFAULT_WORKERS})"
+    )
+    
+    parser.add_argument(
+        "--copy",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=f"Salin PDF ke {PDF_FOLDER} (default: --no-copy, diproses langsung dari folder sumber)"
+    )
+    
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Tampilkan log detail per tahap pemrosesan"
+    )
+    
     args = parser.parse_args()
     
+    if args.verbose:
+        # Via env so spawned worker processes log at the same level
+        os.environ["BULK_LOG_LEVEL"] = "DEBUG"
+        logger.setLevel(logging.DEBUG)
+    
     # Banner
     print(f"{Colors.CYAN}{'='*60}{Colors.END}")
     print(f"{Colors.BOLD}🚀 {APP_NAME.upper()} - BULK PDF PROCESSOR{Colors.END}")
@@ -311,7 +555,10 @@ Contoh penggunaan:
         bulk_process_pdfs(
             folder=args.folder,
             dry_run=args.dry_run,
-            force=args.force
+            force=args.force,
+            concurrency=max(1, args.concurrency or EMBED_MAX_IN_FLIGHT // max(1, args.workers)),
+            workers=max(1, args.workers),
+            copy_to_folder=args.copy
         )
     except KeyboardInterrupt:
         log_warning("\n⚠️  Proses dibatalkan oleh user")
@@ -6,113 +6,251 @@ Dedicated chat interface for real-time streaming conversations with the Tanya Ma
 Focus on Ask question (streaming) functionality with enhanced user experience.
 """
 
-import requests
 import json
 import time
 import sys
 import os
-from datetime import datetime
-import pytz
-from typing import Generator, Dict, Any, Optional
+import socket
+import queue
+import threading
+import functools
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from typing import Generator, Dict, Any, Iterator, List, Optional
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # accepts bytes/memoryview, no decode step
+except ImportError:
+    def _json_loads(payload):
+        return json.loads(bytes(payload))
+
+_DATA_PREFIX = b'data: '
+_DATA_PREFIX_LEN = len(_DATA_PREFIX)
+HEALTH_CACHE_TTL = 2.0  # seconds
+# Nagle off so small token segments are not held back; a larger receive buffer
+# lets each recv() drain a burst of tokens
+STREAM_SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_RCVBUF, 256 * 1024),
+]
+
+
+def _stdout_fd() -> Optional[int]:
+    """File descriptor behind sys.stdout, None if it has none (e.g. captured)"""
+    try:
+        return sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _write_fd(fd: int, data: bytes):
+    """os.write until every byte is out - pipes may accept partial writes"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _prefetch_batches(batches: Iterator[List[Dict[str, Any]]]) -> Generator[List[Dict[str, Any]], None, None]:
+    """Read event batches on a background thread so the socket is drained while tokens render"""
+    ready: queue.SimpleQueue = queue.SimpleQueue()
+    stop = threading.Event()
+    
+    def reader():
+        try:
+            for batch in batches:
+                ready.put(batch)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            ready.put([{"type": "error", "error": str(e)}])
+        finally:
+            ready.put(None)
+    
+    threading.Thread(target=reader, daemon=True).start()
+    try:
+        while (batch := ready.get()) is not None:
+            # Merge whatever the reader got ahead with into one render
+            while True:
+                try:
+                    more = ready.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    yield batch
+                    return
+                batch.extend(more)
+            yield batch
+    finally:
+        stop.set()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_local_timezone():
+    """Detect local timezone automatically (once per process)"""
+    try:
+        # For better detection, use platform-specific methods
+        try:
+            # Linux/Mac approach
+            if os.path.exists('/etc/timezone'):
+                with open('/etc/timezone', 'r') as f:
+                    tz_name = f.read().strip()
+                    return ZoneInfo(tz_name)
+            
+            # Alternative approach: map the local UTC offset
+            local_offset = time.timezone if (time.daylight == 0) else time.altzone
+            local_offset = -local_offset / 3600  # Convert to hours
+            
+            # Map common timezone offsets to Indonesian regions
+            tz_map = {
+                7: 'Asia/Jakarta',     # WIB (Waktu Indonesia Barat) - Jawa, Sumatra
+                8: 'Asia/Makassar',    # WITA (Waktu Indonesia Tengah) - Sulawesi, Bali, NTB, NTT
+                9: 'Asia/Jayapura',    # WIT (Waktu Indonesia Timur) - Papua, Maluku
+                0: 'UTC',              # UTC fallback
+            }
+            
+            if local_offset in tz_map:
+                return ZoneInfo(tz_map[local_offset])
+            
+        except:
+            pass
+        
+        # Fallback: try to detect from system
+        try:
+            import subprocess
+            result = subprocess.run(['timedatectl', 'show', '--property=Timezone', '--value'], 
+                                  capture_output=True, text=True)
+            if result.returncode == 0:
+                tz_name = result.stdout.strip()
+                if tz_name:
+                    return ZoneInfo(tz_name)
+        except:
+            pass
+            
+        # Final fallback to local system timezone
+        return ZoneInfo(time.tzname[0]) if time.tzname[0] else timezone.utc
+        
+    except Exception:
+        # Ultimate fallback - use system local time info
+        try:
+            # Get local timezone using datetime
+            local_dt = datetime.now()
+            utc_dt = datetime.utcnow() 
+            
+            # Calculate offset
+            offset = local_dt - utc_dt
+            offset_hours = round(offset.total_seconds() / 3600)
+            
+            # Common Indonesian timezone mappings based on offset
+            offset_to_tz = {
+                7: 'Asia/Jakarta',     # WIB - Waktu Indonesia Barat
+                8: 'Asia/Makassar',    # WITA - Waktu Indonesia Tengah  
+                9: 'Asia/Jayapura',    # WIT - Waktu Indonesia Timur
+                0: 'UTC',              # UTC fallback
+            }
+            
+            if offset_hours in offset_to_tz:
+                return ZoneInfo(offset_to_tz[offset_hours])
+                
+        except Exception:
+            pass
+            
+        # Absolute fallback
+        return timezone.utc
 
 class TanyaMailStreamingChat:
     """Dedicated streaming chat client for Tanya Ma'il API"""
     
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    _EXIT = frozenset({'/exit', '/quit', 'exit', 'quit', 'keluar'})
+    _EXIT_MAX_LEN = max(map(len, _EXIT))
+    
+    # Static screens are pre-joined so each is a single stdout write
+    _WELCOME_BANNER = "\n".join([
+        "🤖 Tanya Ma'il - Streaming Chat Interface",
+        "=" * 50,
+        "💬 Real-time conversation dengan dokumen Anda",
+        "⚡ Respons streaming untuk pengalaman yang lebih interaktif",
+    ]) + "\n"
+    _WELCOME_TIPS = "\n".join([
+        "\n💡 Tips:",
+        "   - Ketik pertanyaan Anda dan tekan Enter",
+        "   - Gunakan '/help' untuk melihat perintah khusus",
+        "   - Ketik '/exit' untuk keluar",
+        "   - Respons akan muncul secara real-time",
+        "=" * 50,
+    ]) + "\n"
+    _HELP_TEXT = "\n".join([
+        "\n📋 Perintah Chat Streaming:",
+        "─" * 40,
+        "🔹 /help         - Tampilkan bantuan ini",
+        "🔹 /clear        - Bersihkan layar",
+        "🔹 /status       - Cek status API",
+        "🔹 /stats        - Statistik percakapan",
+        "🔹 /timezone     - Info timezone saat ini",
+        "🔹 /session      - Info session saat ini",
+        "🔹 /exit         - Keluar dari chat",
+        "🔹 <pertanyaan>  - Tanyakan sesuatu tentang dokumen",
+        "─" * 40,
+        "\n📚 Contoh Pertanyaan:",
+        "   • Kapan pendaftaran ditutup?",
+        "   • Apa saja syarat pendaftaran?",
+        "   • Berapa biaya kuliah?",
+        "   • Bagaimana cara mendaftar?",
+        "─" * 40,
+    ]) + "\n"
+    
+    def __init__(self, base_url: str = "http://localhost:8000", prefetch: bool = False):
         """Initialize streaming chat client"""
+        # Imported here so `--help` does not pay for loading requests/urllib3
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        class StreamingAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                kwargs['socket_options'] = STREAM_SOCKET_OPTIONS
+                super().init_poolmanager(*args, **kwargs)
+        
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
+        # One backend, so a small pool whose socket is reused for every answer
+        adapter = StreamingAdapter(pool_connections=1, pool_maxsize=4, pool_block=False)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Connection': 'keep-alive', 'Accept': 'text/event-stream'})
         self.conversation_count = 0
-        self.local_tz = self._detect_local_timezone()
+        self.local_tz = _get_local_timezone()
+        self._tz_short_name = str(self.local_tz).split('/')[-1]
+        self._refresh_utc_offset(datetime.now(self.local_tz))
         self.session_id = None  # Will be set after first request
+        self.prefetch = prefetch
+        self._health_cache = (0.0, None)
+        self._commands = {
+            '/help': self.print_help,
+            '/clear': self._cmd_clear,
+            '/status': self._cmd_status,
+            '/stats': self.print_stats,
+            '/timezone': self.print_timezone_info,
+            '/session': self.print_session_info,
+        }
+    
+    def _refresh_utc_offset(self, current_time: datetime):
+        """Cache the "UTC+HH:MM" display string for current_time's offset"""
+        offset = current_time.strftime('%z')
+        self._utc_offset_str = f"UTC{offset[:-2]}:{offset[-2:]}"
     
-    def _detect_local_timezone(self):
-        """Detect local timezone automatically"""
-        try:
-            # Try to get system timezone
-            import time
-            local_tz_name = time.tzname[time.daylight]
-            
-            # For better detection, use platform-specific methods
-            try:
-                # Linux/Mac approach
-                import os
-                if os.path.exists('/etc/timezone'):
-                    with open('/etc/timezone', 'r') as f:
-                        tz_name = f.read().strip()
-                        return pytz.timezone(tz_name)
-                
-                # Alternative approach using datetime
-                from datetime import timezone
-                import time
-                
-                # Get local timezone offset
-                local_offset = time.timezone if (time.daylight == 0) else time.altzone
-                local_offset = -local_offset / 3600  # Convert to hours
-                
-                # Map common timezone offsets to Indonesian regions
-                tz_map = {
-                    7: 'Asia/Jakarta',     # WIB (Waktu Indonesia Barat) - Jawa, Sumatra
-                    8: 'Asia/Makassar',    # WITA (Waktu Indonesia Tengah) - Sulawesi, Bali, NTB, NTT
-                    9: 'Asia/Jayapura',    # WIT (Waktu Indonesia Timur) - Papua, Maluku
-                    0: 'UTC',              # UTC fallback
-                }
-                
-                if local_offset in tz_map:
-                    return pytz.timezone(tz_map[local_offset])
-                
-            except:
-                pass
-            
-            # Fallback: try to detect from system
-            try:
-                import subprocess
-                result = subprocess.run(['timedatectl', 'show', '--property=Timezone', '--value'], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
-                    tz_name = result.stdout.strip()
-                    if tz_name:
-                        return pytz.timezone(tz_name)
-            except:
-                pass
-                
-            # Final fallback to local system timezone
-            return pytz.timezone(time.tzname[0]) if time.tzname[0] else pytz.UTC
-            
-        except Exception:
-            # Ultimate fallback - use system local time info
-            try:
-                # Get local timezone using datetime
-                local_dt = datetime.now()
-                utc_dt = datetime.utcnow() 
-                
-                # Calculate offset
-                offset = local_dt - utc_dt
-                offset_hours = round(offset.total_seconds() / 3600)
-                
-                # Common Indonesian timezone mappings based on offset
-                offset_to_tz = {
-                    7: 'Asia/Jakarta',     # WIB - Waktu Indonesia Barat
-                    8: 'Asia/Makassar',    # WITA - Waktu Indonesia Tengah  
-                    9: 'Asia/Jayapura',    # WIT - Waktu Indonesia Timur
-                    0: 'UTC',              # UTC fallback
-                }
-                
-                if offset_hours in offset_to_tz:
-                    return pytz.timezone(offset_to_tz[offset_hours])
-                    
-            except Exception:
-                pass
-                
-            # Absolute fallback
-            return pytz.UTC
-        
     def health_check(self) -> Dict[str, Any]:
         """Check API health status"""
+        checked_at, cached = self._health_cache
+        if cached is not None and time.monotonic() - checked_at < HEALTH_CACHE_TTL:
+            return cached
         try:
             response = self.session.get(f"{self.base_url}/health")
-            response.raise_for_status()
-            return response.json()
+            if response.status_code >= 400:
+                return {"status": "error", "message": f"HTTP {response.status_code}"}
+            health = response.json()
+            # Only successful checks are reused so a restarted server is seen at once
+            self._health_cache = (time.monotonic(), health)
+            return health
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
@@ -123,6 +261,16 @@ class TanyaMailStreamingChat:
         filename_filter: Optional[str] = None
     ) -> Generator[Dict[str, Any], None, None]:
         """Ask a question with streaming response"""
+        for events in self.ask_question_stream_batches(question, top_k, filename_filter):
+            yield from events
+    
+    def ask_question_stream_batches(
+        self, 
+        question: str, 
+        top_k: int = 3,
+        filename_filter: Optional[str] = None
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """Ask a question with streaming response, one list of events per network read"""
         data = {
             "question": question,
             "top_k": top_k,
@@ -138,87 +286,84 @@ class TanyaMailStreamingChat:
                 f"{self.base_url}/ask",
                 json=data,
                 stream=True,
-                headers={'Accept': 'text/event-stream'},
                 timeout=30
             )
-            response.raise_for_status()
+            if response.status_code >= 400:
+                response.close()
+                yield [{"type": "error", "error": f"HTTP {response.status_code}"}]
+                return
             
-            for line in response.iter_lines():
-                if line:
-                    line = line.decode('utf-8')
-                    if line.startswith('data: '):
+            # Split lines ourselves - iter_lines re-scans its pending buffer on every chunk
+            buf = bytearray()
+            for chunk in response.iter_content(chunk_size=8192):
+                buf += chunk
+                events = []
+                start = 0
+                # Parse lines in place through a view; the buffer is trimmed once per chunk
+                with memoryview(buf) as view:
+                    while (nl := buf.find(b'\n', start)) != -1:
+                        end = nl - 1 if nl > start and buf[nl - 1] == 0x0D else nl
+                        line_start, start = start, nl + 1
+                        if view[line_start:line_start + _DATA_PREFIX_LEN] != _DATA_PREFIX:
+                            continue
                         try:
-                            event_data = json.loads(line[6:])
-                            # Capture session_id from first response
-                            if event_data.get('type') == 'session':
-                                self.session_id = event_data.get('session_id')
-                            yield event_data
-                        except json.JSONDecodeError:
+                            event_data = _json_loads(view[line_start + _DATA_PREFIX_LEN:end])
+                        except ValueError:
                             continue
+                        # Capture session_id from first response
+                        if event_data.get('type') == 'session':
+                            self.session_id = event_data.get('session_id')
+                        events.append(event_data)
+                del buf[:start]
+                if events:
+                    yield events
                             
         except Exception as e:
-            yield {"type": "error", "error": str(e)}
+            yield [{"type": "error", "error": str(e)}]
     
     def print_welcome(self):
         """Print welcome message"""
         current_time = datetime.now(self.local_tz)
         
-        # Get timezone name for display
-        tz_name = str(self.local_tz).split('/')[-1] if '/' in str(self.local_tz) else str(self.local_tz)
-        
-        print("🤖 Tanya Ma'il - Streaming Chat Interface")
-        print("=" * 50)
-        print("💬 Real-time conversation dengan dokumen Anda")
-        print("⚡ Respons streaming untuk pengalaman yang lebih interaktif")
-        print(f"🕐 Waktu: {current_time.strftime('%H:%M:%S')}, {current_time.strftime('%d %B %Y')}")
-        print(f"🌏 Timezone: {tz_name} (UTC{current_time.strftime('%z')[:-2]}:{current_time.strftime('%z')[-2:]})")
-        print("")
+        # Shown before the health check so the banner is not held up by it
+        sys.stdout.write(
+            f"{self._WELCOME_BANNER}"
+            f"🕐 Waktu: {current_time.strftime('%H:%M:%S, %d %B %Y')}\n"
+            f"🌏 Timezone: {self._tz_short_name} ({self._utc_offset_str})\n\n"
+        )
+        sys.stdout.flush()
         
         # Check API health
         health = self.health_check()
         if health.get('status') == 'healthy':
-            print("✅ API Status: Terhubung")
-            print(f"📊 Total dokumen: {health.get('total_documents', 0)}")
-            print(f"📁 File tersedia: {health.get('total_files', 0)}")
-        else:
-            print("❌ API Status: Tidak terhubung")
-            print(f"   Error: {health.get('message', 'Unknown error')}")
-            print("\nPastikan server API berjalan dengan: python run_streaming_api.py")
-            return False
+            sys.stdout.write(
+                "✅ API Status: Terhubung\n"
+                f"📊 Total dokumen: {health.get('total_documents', 0)}\n"
+                f"📁 File tersedia: {health.get('total_files', 0)}\n"
+                f"{self._WELCOME_TIPS}"
+            )
+            sys.stdout.flush()
+            return True
         
-        print("\n💡 Tips:")
-        print("   - Ketik pertanyaan Anda dan tekan Enter")
-        print("   - Gunakan '/help' untuk melihat perintah khusus")
-        print("   - Ketik '/exit' untuk keluar")
-        print("   - Respons akan muncul secara real-time")
-        print("=" * 50)
-        return True
+        sys.stdout.write(
+            "❌ API Status: Tidak terhubung\n"
+            f"   Error: {health.get('message', 'Unknown error')}\n"
+            "\nPastikan server API berjalan dengan: python run_streaming_api.py\n"
+        )
+        sys.stdout.flush()
+        return False
     
     def print_help(self):
         """Print help information"""
-        print("\n📋 Perintah Chat Streaming:")
-        print("─" * 40)
-        print("🔹 /help         - Tampilkan bantuan ini")
-        print("🔹 /clear        - Bersihkan layar")
-        print("🔹 /status       - Cek status API")
-        print("🔹 /stats        - Statistik percakapan")
-        print("🔹 /timezone     - Info timezone saat ini")
-        print("🔹 /session      - Info session saat ini")
-        print("🔹 /exit         - Keluar dari chat")
-        print("🔹 <pertanyaan>  - Tanyakan sesuatu tentang dokumen")
-        print("─" * 40)
-        
-        print("\n📚 Contoh Pertanyaan:")
-        print("   • Kapan pendaftaran ditutup?")
-        print("   • Apa saja syarat pendaftaran?")
-        print("   • Berapa biaya kuliah?")
-        print("   • Bagaimana cara mendaftar?")
-        print("─" * 40)
+        sys.stdout.write(self._HELP_TEXT)
+        sys.stdout.flush()
     
     def print_timezone_info(self):
         """Print detailed timezone information"""
         current_time = datetime.now(self.local_tz)
-        tz_name = str(self.local_tz).split('/')[-1] if '/' in str(self.local_tz) else str(self.local_tz)
+        # Picks up a DST change since the client started
+        self._refresh_utc_offset(current_time)
+        tz_name = self._tz_short_name
         
         print(f"\n🌏 Informasi Timezone:")
         print("─" * 30)
@@ -226,10 +371,10 @@ class TanyaMailStreamingChat:
         print(f"🏷️ Nama: {tz_name}")
         print(f"⏰ Waktu saat ini: {current_time.strftime('%H:%M:%S')}")
         print(f"📅 Tanggal: {current_time.strftime('%A, %d %B %Y')}")
-        print(f"🌍 UTC Offset: UTC{current_time.strftime('%z')[:-2]}:{current_time.strftime('%z')[-2:]}")
+        print(f"🌍 UTC Offset: {self._utc_offset_str}")
         
         # Show UTC time for comparison
-        utc_time = datetime.now(pytz.UTC)
+        utc_time = datetime.now(timezone.utc)
         print(f"🌐 UTC Time: {utc_time.strftime('%H:%M:%S')}")
         print("─" * 30)
     
@@ -250,22 +395,42 @@ class TanyaMailStreamingChat:
     def print_stats(self):
         """Print conversation statistics"""
         current_time = datetime.now(self.local_tz)
-        tz_name = str(self.local_tz).split('/')[-1] if '/' in str(self.local_tz) else str(self.local_tz)
         
-        print("\n📊 Statistik Chat:")
-        print(f"   💬 Total pertanyaan: {self.conversation_count}")
-        print(f"   ⏰ Waktu saat ini: {current_time.strftime('%H:%M:%S')}")
-        print(f"   📅 Tanggal: {current_time.strftime('%d %B %Y')}")
-        print(f"   🌏 Timezone: {tz_name} (UTC{current_time.strftime('%z')[:-2]}:{current_time.strftime('%z')[-2:]})")
+        sys.stdout.write(
+            "\n📊 Statistik Chat:\n"
+            f"   💬 Total pertanyaan: {self.conversation_count}\n"
+            f"   ⏰ Waktu saat ini: {current_time.strftime('%H:%M:%S')}\n"
+            f"   📅 Tanggal: {current_time.strftime('%d %B %Y')}\n"
+            f"   🌏 Timezone: {self._tz_short_name} ({self._utc_offset_str})\n"
+        )
+        sys.stdout.flush()
     
     def clear_screen(self):
         """Clear terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if os.name == 'nt':
+            # Older Windows consoles do not interpret ANSI escapes
+            os.system('cls')
+            return
+        # Clear screen and scrollback, cursor home - no shell spawned
+        sys.stdout.write('\x1b[H\x1b[2J\x1b[3J')
+        sys.stdout.flush()
+    
+    def _cmd_clear(self):
+        self.clear_screen()
+        print("🧹 Layar dibersihkan!")
+    
+    def _cmd_status(self):
+        health = self.health_check()
+        if health.get('status') == 'healthy':
+            print(f"✅ API Status: Terhubung ({health.get('total_documents', 0)} dokumen)")
+        else:
+            print(f"❌ API Status: {health.get('message', 'Error')}")
     
     def format_timestamp(self) -> str:
         """Get formatted timestamp with local timezone"""
-        current_time = datetime.now(self.local_tz)
-        return current_time.strftime("%H:%M:%S")
+        # The process already runs in the local zone - no tz object needed;
+        # strftime formats localtime() itself when no struct is passed
+        return time.strftime("%H:%M:%S")
     
     def handle_streaming_response(self, question: str) -> bool:
         """Handle streaming response and display"""
@@ -274,29 +439,49 @@ class TanyaMailStreamingChat:
         response_text = ""
         sources = []
         error_occurred = False
+        finished = False
+        pending = []
+        # Tokens skip the TextIOWrapper stack and go straight to the fd
+        stdout_fd = _stdout_fd()
         
         try:
-            for event_data in self.ask_question_stream(question):
-                event_type = event_data.get('type', '')
-                
-                if event_type == 'content':
-                    token = event_data.get('token', '')
-                    print(token, end="", flush=True)
-                    response_text += token
-                    
-                elif event_type == 'source':
-                    sources = event_data.get('sources', [])
-                    
-                elif event_type == 'done':
-                    print()  # New line after streaming
-                    if sources:
-                        print(f"📚 Sumber: {', '.join(sources)}")
-                    break
+            batches = self.ask_question_stream_batches(question)
+            if self.prefetch:
+                batches = _prefetch_batches(batches)
+            for events in batches:
+                for event_data in events:
+                    event_type = event_data.get('type', '')
                     
-                elif event_type == 'error':
-                    error_message = event_data.get('error', 'Unknown error')
-                    print(f"\n❌ Error: {error_message}")
-                    error_occurred = True
+                    if event_type == 'content':
+                        pending.append(event_data.get('token', ''))
+                        
+                    elif event_type == 'source':
+                        sources = event_data.get('sources', [])
+                        
+                    elif event_type in ('done', 'error'):
+                        finished = True
+                        break
+                
+                # One write + flush per network read instead of per token
+                if pending:
+                    text = ''.join(pending)
+                    pending.clear()
+                    if stdout_fd is not None:
+                        _write_fd(stdout_fd, text.encode(sys.stdout.encoding or 'utf-8', 'replace'))
+                    else:
+                        sys.stdout.write(text)
+                        sys.stdout.flush()
+                    response_text += text
+                
+                if finished:
+                    if event_type == 'done':
+                        print()  # New line after streaming
+                        if sources:
+                            print(f"📚 Sumber: {', '.join(sources)}")
+                    else:
+                        error_message = event_data.get('error', 'Unknown error')
+                        print(f"\n❌ Error: {error_message}")
+                        error_occurred = True
                     break
                     
         except KeyboardInterrupt:
@@ -327,40 +512,19 @@ class TanyaMailStreamingChat:
                 if not user_input:
                     continue
                 
-                # Handle special commands
-                if user_input.lower() in ['/exit', '/quit', 'exit', 'quit', 'keluar']:
-                    print("\n👋 Terima kasih telah menggunakan Tanya Ma'il Chat!")
-                    print(f"📊 Total pertanyaan yang diajukan: {self.conversation_count}")
-                    break
-                    
-                elif user_input.lower() == '/help':
-                    self.print_help()
-                    continue
-                    
-                elif user_input.lower() == '/clear':
-                    self.clear_screen()
-                    print("🧹 Layar dibersihkan!")
-                    continue
-                    
-                elif user_input.lower() == '/status':
-                    health = self.health_check()
-                    if health.get('status') == 'healthy':
-                        print(f"✅ API Status: Terhubung ({health.get('total_documents', 0)} dokumen)")
-                    else:
-                        print(f"❌ API Status: {health.get('message', 'Error')}")
-                    continue
+                # Handle special commands - only '/...' or a bare exit word can be one,
+                # so ordinary questions skip the lower() and lookups
+                if user_input[0] == '/' or len(user_input) <= self._EXIT_MAX_LEN:
+                    command = user_input.lower()
+                    if command in self._EXIT:
+                        print("\n👋 Terima kasih telah menggunakan Tanya Ma'il Chat!")
+                        print(f"📊 Total pertanyaan yang diajukan: {self.conversation_count}")
+                        break
                     
-                elif user_input.lower() == '/stats':
-                    self.print_stats()
-                    continue
-                    
-                elif user_input.lower() == '/timezone':
-                    self.print_timezone_info()
-                    continue
-                    
-                elif user_input.lower() == '/session':
-                    self.print_session_info()
-                    continue
+                    handler = self._commands.get(command)
+                    if handler:
+                        handler()
+                        continue
                 
                 # Handle regular questions
                 if len(user_input) < 3:
@@ -384,8 +548,13 @@ class TanyaMailStreamingChat:
 def main():
     """Main entry point"""
     # Check for command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--help' or sys.argv[1] == '-h':
+    args = sys.argv[1:]
+    prefetch = '--async' in args
+    if prefetch:
+        args.remove('--async')
+    
+    if args:
+        if args[0] == '--help' or args[0] == '-h':
             print("Tanya Ma'il Streaming Chat")
             print("========================")
             print("Usage: python chat_streaming.py [options]")
@@ -393,14 +562,15 @@ def main():
             print("Options:")
             print("  --help, -h     Show this help message")
             print("  --url URL      Custom API URL (default: http://localhost:8000)")
+            print("  --async        Read the stream on a background thread while rendering")
             print("")
             print("Examples:")
             print("  python chat_streaming.py")
             print("  python chat_streaming.py --url http://localhost:8080")
             return
         
-        elif sys.argv[1] == '--url' and len(sys.argv) > 2:
-            api_url = sys.argv[2]
+        elif args[0] == '--url' and len(args) > 1:
+            api_url = args[1]
         else:
             print("❌ Invalid argument. Use --help for usage information.")
             return
@@ -408,7 +578,7 @@ def main():
         api_url = "http://localhost:8000"
     
     # Initialize and run chat
-    chat = TanyaMailStreamingChat(base_url=api_url)
+    chat = TanyaMailStreamingChat(base_url=api_url, prefetch=prefetch)
     chat.run_chat()
 
 if __name__ == "__main__":
@@ -14,36 +14,318 @@ Features:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import atexit
+import copy
 import json
+import re
 import uuid
-from typing import Dict, List, Optional, Any, Generator
+import time
+import asyncio
+import itertools
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, Callable, Dict, Iterable, Iterator, List, Optional, Any, Generator, Tuple
 from pathlib import Path
 try:
-    import sseclient  # pip install sseclient-py
-    STREAMING_AVAILABLE = True
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+    MULTIPART_STREAMING_AVAILABLE = True
 except ImportError:
-    STREAMING_AVAILABLE = False
-    print("⚠️ sseclient-py not installed. Streaming features disabled.")
-    print("💡 Install with: pip install sseclient-py")
-from datetime import datetime
+    MULTIPART_STREAMING_AVAILABLE = False
+try:
+    import httpx  # async client for concurrent requests
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+from datetime import datetime, timezone
 import argparse
 
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+try:
+    import zstandard  # noqa: F401 - lets urllib3/httpx decode zstd responses
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+# Decoding also needs urllib3>=2 (requests) and httpx>=0.27 (async client)
+import urllib3.response
+REQUESTS_ZSTD_AVAILABLE = getattr(urllib3.response, "HAS_ZSTD", False)
+HTTPX_ZSTD_AVAILABLE = (
+    ZSTD_AVAILABLE and HTTPX_AVAILABLE
+    and tuple(int(part) for part in httpx.__version__.split(".")[:2]) >= (0, 27)
+)
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+EXPORT_CHUNK_SIZE = 1024 * 1024
+JSON_HEADERS = {"Content-Type": "application/json"}
+SSE_HEADERS = {"Accept": "text/event-stream", "Cache-Control": "no-cache"}
+SSE_POST_HEADERS = {**SSE_HEADERS, **JSON_HEADERS}
+SSE_READ_SIZE = 64 * 1024
+
+# Named SSE events and the JSON "type" of data-only frames, mapped to one kind
+_SSE_KINDS = {
+    "token": "token", "content": "token",
+    "sources": "sources", "source": "sources",
+    "session_id": "session", "session": "session",
+    "end": "end", "done": "end",
+    "error": "error",
+}
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize question so trivially different phrasings share a key"""
+    return _WHITESPACE_RE.sub(" ", question).strip().lower().rstrip("?!. ")
+
+
+class ResponseCache:
+    """
+    Client-side LRU + TTL cache with an optional semantic tier
+    
+    Exact tier: normalized text + request params. Semantic tier: cosine
+    similarity of sentence-transformers embeddings for the same params.
+    """
+    
+    def __init__(
+        self, 
+        maxsize: int = 512, 
+        ttl: float = 600, 
+        semantic: bool = False,
+        threshold: float = 0.95,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.semantic = semantic
+        self.threshold = threshold
+        self.model_name = model_name
+        self._model = None
+        self._last_embedding: Optional[Tuple[str, Any]] = None
+        # key -> (expires_at, value, embedding)
+        self._entries: "OrderedDict[tuple, Tuple[float, Any, Any]]" = OrderedDict()
+    
+    def _embed(self, text: str):
+        """Normalized embedding of text, None if the semantic tier is unavailable"""
+        if self._last_embedding and self._last_embedding[0] == text:
+            return self._last_embedding[1]
+        if self._model is None:
+            try:
+                # Loaded on first use - sentence-transformers pulls in torch
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            except ImportError:
+                print("⚠️ sentence-transformers not installed. Semantic cache disabled.")
+                self.semantic = False
+                return None
+        vector = self._model.encode(text, normalize_embeddings=True)
+        self._last_embedding = (text, vector)
+        return vector
+    
+    def get(self, text: str, params: tuple) -> Optional[Any]:
+        """Cached value for text + params, None on miss"""
+        if self.maxsize <= 0:
+            return None
+        normalized = normalize_question(text)
+        key = (normalized,) + params
+        now = time.monotonic()
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            del self._entries[key]
+        
+        if not self.semantic:
+            return None
+        vector = self._embed(normalized)
+        if vector is None:
+            return None
+        
+        best_key, best_score = None, self.threshold
+        for other_key, (expires_at, _, other_vector) in self._entries.items():
+            if other_key[1:] != params or other_vector is None or expires_at <= now:
+                continue
+            score = float(other_vector @ vector)
+            if score >= best_score:
+                best_key, best_score = other_key, score
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return copy.deepcopy(self._entries[best_key][1])
+    
+    def put(self, text: str, params: tuple, value: Any):
+        """Cache value, evicting the least recently used entries"""
+        if self.maxsize <= 0:
+            return
+        normalized = normalize_question(text)
+        key = (normalized,) + params
+        vector = self._embed(normalized) if self.semantic else None
+        # Copies in and out, so callers cannot mutate a cached entry
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value), vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+
+
+def iter_sse_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Split decoded stream chunks on "\n" only, carrying partial lines across chunks"""
+    pending = ""
+    for chunk in chunks:
+        lines = (pending + chunk).split("\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_sse_events(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], str]]:
+    """Group SSE lines into (event name, data) pairs, dispatched on each blank line"""
+    event_name = None
+    data_buf: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r")
+        if not line:
+            if data_buf:
+                yield event_name, "\n".join(data_buf)
+            event_name = None
+            data_buf = []
+        elif line.startswith("data:"):
+            data_buf.append(line[6:] if line.startswith("data: ") else line[5:])
+        elif line.startswith("event:"):
+            event_name = line[6:].strip()
+    if data_buf:
+        yield event_name, "\n".join(data_buf)
+
+
+def parse_sse_event(event_name: Optional[str], data: str) -> Tuple[Optional[str], Any]:
+    """
+    Normalize one SSE event to (kind, value)
+    
+    kind adalah "token", "sources", "session", "end", "error" atau None (abaikan)
+    """
+    if event_name is None:
+        # Data-only frames carry their type inside the JSON payload
+        try:
+            payload = _loads(data)
+        except ValueError:
+            return None, None
+        kind = _SSE_KINDS.get(payload.get("type"))
+        value = {
+            "token": payload.get("token", ""),
+            "sources": payload.get("sources", []),
+            "session": payload.get("session_id"),
+            "error": payload.get("error", "Unknown error"),
+        }.get(kind)
+        return kind, value
+    
+    kind = _SSE_KINDS.get(event_name)
+    if kind == "sources":
+        return kind, _loads(data)
+    return kind, data
+
 
 class TanyaMailLangChainClient:
     """Comprehensive client untuk Tanya Ma'il LangChain API"""
     
-    def __init__(self, base_url: str = "http://localhost:8000", session_id: Optional[str] = None):
+    _EXIT = frozenset({'exit', 'quit', 'bye'})
+    # Chat commands that take an argument, e.g. "/export path.json"
+    _ARG_COMMANDS = frozenset({'/export'})
+    
+    def __init__(
+        self, 
+        base_url: str = "http://localhost:8000", 
+        session_id: Optional[str] = None,
+        max_concurrency: int = 16,
+        rate_limit_qpm: int = 500,
+        cache_size: int = 512,
+        cache_ttl: float = 600,
+        enable_semantic_cache: bool = False,
+        history_cap: int = 256,
+        history_overflow_path: Optional[str] = None,
+        enable_zstd: bool = True
+    ):
         """
         Initialize client
         
         Args:
             base_url: Base URL API server
             session_id: Session ID untuk conversation continuity
+            max_concurrency: Maksimal request async yang berjalan bersamaan
+            rate_limit_qpm: Maksimal request async per menit (0 = tanpa batas)
+            cache_size: Jumlah jawaban/hasil search yang di-cache (0 = nonaktif)
+            cache_ttl: Umur cache dalam detik
+            enable_semantic_cache: Cocokkan pertanyaan mirip via embedding (sentence-transformers)
+            history_cap: Jumlah exchange terakhir yang disimpan di conversation_history
+            history_overflow_path: File JSONL untuk exchange lama yang tergeser (opsional)
+            enable_zstd: Tawarkan kompresi zstd ke server (butuh zstandard, urllib3>=2 / httpx>=0.27)
         """
         self.base_url = base_url.rstrip('/')
         self.session_id = session_id or str(uuid.uuid4())
+        self._sid_short = self.session_id[:8]
         self.session = requests.Session()
-        self.conversation_history: List[Dict[str, Any]] = []
+        # Warm keep-alive pool. Refused connections are retried for every method
+        # (nothing was sent); gateway errors only for idempotent GET/DELETE, and
+        # the last response is returned as-is so the server's error body survives
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET", "DELETE"]),
+                raise_on_status=False
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # The streamed multipart body can be read only once: never retry uploads
+        self.session.mount(f"{self.base_url}/upload", HTTPAdapter(max_retries=0))
+        self.session.headers["Connection"] = "keep-alive"
+        # Only advertise zstd where it can be decoded; gzip stays as the fallback
+        self.session.headers["Accept-Encoding"] = (
+            "zstd, gzip, deflate" if enable_zstd and REQUESTS_ZSTD_AVAILABLE else "gzip, deflate")
+        self._async_accept_encoding = (
+            "zstd, gzip, deflate" if enable_zstd and HTTPX_ZSTD_AVAILABLE else "gzip, deflate")
+        atexit.register(self.session.close)
+        self._aclient: Optional["httpx.AsyncClient"] = None
+        self.max_concurrency = max_concurrency
+        self.rate_limit_qpm = rate_limit_qpm
+        self._sem: Optional[asyncio.Semaphore] = None
+        # Token bucket: allows bursts of max_concurrency, refills at rate_limit_qpm
+        self._tokens = float(max_concurrency)
+        self._last_refill = time.monotonic()
+        # Only the newest history_cap exchanges stay in memory
+        self.conversation_history: deque = deque(maxlen=history_cap)
+        self._overflow_path = history_overflow_path
+        self.cache = ResponseCache(cache_size, cache_ttl, semantic=enable_semantic_cache)
+        # None until /ask/batch has been tried once
+        self._batch_endpoint_available: Optional[bool] = None
+        self._commands: Dict[str, Callable[..., None]] = {
+            '/help': self._show_chat_help,
+            '/status': self.print_status,
+            '/history': self._show_local_history,
+            '/clear': self._clear_local_history,
+            '/files': self._show_files,
+            '/export': self._export_current_session,
+        }
         
         # Test connection
         try:
@@ -59,13 +341,13 @@ class TanyaMailLangChainClient:
         """Get system health status"""
         response = self.session.get(f"{self.base_url}/health")
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     def get_info(self) -> Dict[str, Any]:
         """Get API information"""
         response = self.session.get(f"{self.base_url}/")
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     # === Question Answering ===
     
@@ -75,7 +357,8 @@ class TanyaMailLangChainClient:
         top_k: int = 3, 
         filename_filter: Optional[str] = None,
         use_langchain: bool = True,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        use_cache: bool = False
     ) -> Dict[str, Any]:
         """
         Ask question dengan session support
@@ -86,10 +369,20 @@ class TanyaMailLangChainClient:
             filename_filter: Filter berdasarkan nama file tertentu
             use_langchain: Gunakan sistem LangChain (True) atau legacy (False)
             session_id: Session ID khusus (default: client session)
+            use_cache: Pertanyaan stateless - jawaban boleh dari cache, tanpa konteks percakapan
         
         Returns:
             Dict dengan answer, sources, session_id, timestamp
         """
+        # Answers depend on the server-side conversation, so only opted-in
+        # stateless asks are cached
+        cache_params = (top_k, filename_filter, use_langchain)
+        if use_cache:
+            cached = self.cache.get(question, cache_params)
+            if cached is not None:
+                self._record_answer(question, cached)
+                return cached
+        
         payload = {
             "question": question,
             "top_k": top_k,
@@ -99,20 +392,93 @@ class TanyaMailLangChainClient:
             "use_langchain": use_langchain
         }
         
-        response = self.session.post(f"{self.base_url}/ask", json=payload)
+        response = self.session.post(f"{self.base_url}/ask", data=_dumps(payload), headers=JSON_HEADERS)
         response.raise_for_status()
-        result = response.json()
+        result = _loads(response.content)
+        
+        if use_cache:
+            self.cache.put(question, cache_params, result)
+        self._record_answer(question, result)
+        return result
+    
+    def ask_batch(
+        self, 
+        questions: List[str], 
+        top_k: int = 3, 
+        use_langchain: bool = True,
+        max_in_flight: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ask many questions with one request per sub-batch
+        
+        Posts to /ask/batch; if the server does not have it, falls back to
+        concurrent aask_question calls (or sequential ask_question without httpx).
+        Must not be called from inside a running event loop - use aask_many there.
+        
+        Args:
+            questions: Daftar pertanyaan
+            top_k: Jumlah dokumen relevan per pertanyaan
+            use_langchain: Gunakan sistem LangChain
+            max_in_flight: Maksimal pertanyaan per sub-batch (default: semua sekaligus)
+        
+        Returns:
+            List jawaban, urutan sama dengan questions
+        """
+        step = max_in_flight or len(questions) or 1
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(questions), step):
+            results.extend(self._ask_sub_batch(questions[start:start + step], top_k, use_langchain))
+        return results
+    
+    def _ask_sub_batch(self, questions: List[str], top_k: int, use_langchain: bool) -> List[Dict[str, Any]]:
+        if self._batch_endpoint_available is not False:
+            payload = {
+                "questions": questions,
+                "top_k": top_k,
+                "session_id": self.session_id,
+                "use_langchain": use_langchain
+            }
+            response = self.session.post(
+                f"{self.base_url}/ask/batch", data=_dumps(payload), headers=JSON_HEADERS)
+            if response.status_code not in (404, 405):
+                response.raise_for_status()
+                self._batch_endpoint_available = True
+                data = _loads(response.content)
+                results = data["results"] if isinstance(data, dict) else data
+                for question, result in zip(questions, results):
+                    self._record_answer(question, result)
+                return results
+            self._batch_endpoint_available = False
+        
+        if not HTTPX_AVAILABLE:
+            return [self.ask_question(q, top_k=top_k, use_langchain=use_langchain) for q in questions]
+        
+        async def gather_answers():
+            try:
+                return await self.aask_many(questions, top_k=top_k, use_langchain=use_langchain)
+            finally:
+                # The async client is bound to this short-lived event loop
+                await self.aclose()
         
-        # Add to local history
-        self.conversation_history.append({
+        return asyncio.run(gather_answers())
+    
+    def _append_history(self, exchange: Dict[str, Any]):
+        """Append to local history, spilling the evicted exchange to the overflow file"""
+        history = self.conversation_history
+        if self._overflow_path and len(history) == history.maxlen:
+            with open(self._overflow_path, "ab") as f:
+                f.write(_dumps(history[0]) + b"\n")
+        history.append(exchange)
+    
+    def _record_answer(self, question: str, result: Dict[str, Any]):
+        """Add a non-streaming answer to local history"""
+        self._append_history({
             "question": question,
             "answer": result.get("answer", ""),
             "sources": result.get("sources", []),
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
             "session_id": result.get("session_id", self.session_id)
         })
-        
-        return result
     
     def ask_question_streaming(
         self, 
@@ -138,12 +504,6 @@ class TanyaMailLangChainClient:
         Returns:
             Dict dengan informasi lengkap setelah streaming selesai
         """
-        if not STREAMING_AVAILABLE:
-            # Fallback to non-streaming
-            result = self.ask_question(question, top_k, filename_filter, use_langchain, session_id)
-            yield result["answer"]
-            return result
-            
         payload = {
             "question": question,
             "top_k": top_k,
@@ -155,39 +515,58 @@ class TanyaMailLangChainClient:
         
         response = self.session.post(
             f"{self.base_url}/ask", 
-            json=payload, 
+            data=_dumps(payload), 
             stream=True,
-            headers={"Accept": "text/event-stream"}
+            headers=SSE_POST_HEADERS
         )
         response.raise_for_status()
+        # text/* without a charset would otherwise be decoded as ISO-8859-1
+        response.encoding = "utf-8"
         
-        full_answer = ""
+        answer_tokens = []
         sources = []
         final_session_id = session_id or self.session_id
         
-        client = sseclient.SSEClient(response)
-        for event in client.events():
-            if event.event == "token":
-                token = event.data
-                full_answer += token
-                yield token
-            elif event.event == "sources":
-                sources = json.loads(event.data)
-            elif event.event == "session_id":
-                final_session_id = event.data
-            elif event.event == "end":
-                break
+        # Split on "\n" only - tokens may contain other line separators. Not
+        # iter_lines(delimiter=...), which yields a spurious "" whenever a
+        # network chunk ends on the delimiter and so splits events early
+        lines = iter_sse_lines(response.iter_content(chunk_size=SSE_READ_SIZE, decode_unicode=True))
+        try:
+            for event_name, data in iter_sse_events(lines):
+                kind, value = parse_sse_event(event_name, data)
+                if kind == "token":
+                    answer_tokens.append(value)
+                    yield value
+                elif kind == "sources":
+                    sources = value
+                elif kind == "session":
+                    final_session_id = value
+                elif kind == "error":
+                    raise Exception(f"Streaming error: {value}")
+                elif kind == "end":
+                    break
+        finally:
+            response.close()
         
-        # Add to local history
+        return self._record_stream(question, "".join(answer_tokens), sources, final_session_id)
+    
+    def _record_stream(
+        self, 
+        question: str, 
+        answer: str, 
+        sources: List[str], 
+        session_id: str
+    ) -> Dict[str, Any]:
+        """Add a streamed answer to local history"""
         result = {
             "question": question,
-            "answer": full_answer,
+            "answer": answer,
             "sources": sources,
-            "session_id": final_session_id,
-            "timestamp": datetime.now().isoformat()
+            "session_id": session_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds")
         }
         
-        self.conversation_history.append(result)
+        self._append_history(result)
         return result
     
     # === LangChain Specific Endpoints ===
@@ -203,9 +582,10 @@ class TanyaMailLangChainClient:
             "session_id": session_id or self.session_id
         }
         
-        response = self.session.post(f"{self.base_url}/langchain/ask", json=payload)
+        response = self.session.post(
+            f"{self.base_url}/langchain/ask", data=_dumps(payload), headers=JSON_HEADERS)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     def ask_agent(
         self, 
@@ -218,60 +598,304 @@ class TanyaMailLangChainClient:
             "session_id": session_id or self.session_id
         }
         
-        response = self.session.post(f"{self.base_url}/langchain/agent", json=payload)
+        response = self.session.post(
+            f"{self.base_url}/langchain/agent", data=_dumps(payload), headers=JSON_HEADERS)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
-    # === File Management ===
+    # === Async API (httpx) ===
     
-    def upload_file(self, file_path: str, kategori: str = "document") -> Dict[str, Any]:
+    def _async_client(self) -> "httpx.AsyncClient":
+        """Shared httpx.AsyncClient, created on first async call"""
+        if not HTTPX_AVAILABLE:
+            raise RuntimeError("httpx not installed. Install with: pip install 'httpx[http2]'")
+        if self._aclient is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._aclient = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                headers={"Accept-Encoding": self._async_accept_encoding},
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+                timeout=httpx.Timeout(60.0)
+            )
+        return self._aclient
+    
+    async def aclose(self):
+        """Close the async client; it is bound to the event loop that used it"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+            self._sem = None
+    
+    async def _acquire_token(self):
+        """Wait until the QPM token bucket allows another request"""
+        if self.rate_limit_qpm <= 0:
+            return
+        rate = self.rate_limit_qpm / 60.0  # tokens per second
+        while True:
+            now = time.monotonic()
+            self._tokens = min(float(self.max_concurrency),
+                               self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / rate)
+    
+    async def _arequest(self, method: str, path: str, **kwargs) -> Any:
+        """Send an async request within the concurrency and rate limits"""
+        client = self._async_client()
+        async with self._sem:
+            await self._acquire_token()
+            response = await client.request(method, path, **kwargs)
+        response.raise_for_status()
+        return _loads(response.content)
+    
+    async def _aget(self, path: str, **kwargs) -> Any:
+        return await self._arequest("GET", path, **kwargs)
+    
+    async def _apost(self, path: str, payload: Dict[str, Any]) -> Any:
+        return await self._arequest("POST", path, content=_dumps(payload), headers=JSON_HEADERS)
+    
+    async def aget_health(self) -> Dict[str, Any]:
+        """Async version of get_health"""
+        return await self._aget("/health")
+    
+    async def alist_files(self) -> List[Dict[str, Any]]:
+        """Async version of list_files"""
+        return await self._aget("/files")
+    
+    async def asearch_documents(
+        self, 
+        query: str, 
+        top_k: int = 5,
+        filename_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Async version of search_documents"""
+        cache_params = ("search", top_k, filename_filter)
+        cached = self.cache.get(query, cache_params)
+        if cached is not None:
+            return cached
+        
+        params = {"query": query, "top_k": top_k}
+        if filename_filter:
+            params["filename_filter"] = filename_filter
+        results = await self._aget("/search", params=params)
+        self.cache.put(query, cache_params, results)
+        return results
+    
+    async def aask_question(
+        self, 
+        question: str, 
+        top_k: int = 3, 
+        filename_filter: Optional[str] = None,
+        use_langchain: bool = True,
+        session_id: Optional[str] = None,
+        use_cache: bool = False
+    ) -> Dict[str, Any]:
+        """Async version of ask_question"""
+        cache_params = (top_k, filename_filter, use_langchain)
+        if use_cache:
+            cached = self.cache.get(question, cache_params)
+            if cached is not None:
+                self._record_answer(question, cached)
+                return cached
+        
+        payload = {
+            "question": question,
+            "top_k": top_k,
+            "filename_filter": filename_filter,
+            "stream": False,
+            "session_id": session_id or self.session_id,
+            "use_langchain": use_langchain
+        }
+        result = await self._apost("/ask", payload)
+        if use_cache:
+            self.cache.put(question, cache_params, result)
+        self._record_answer(question, result)
+        return result
+    
+    async def aask_question_streaming(
+        self, 
+        question: str, 
+        top_k: int = 3,
+        filename_filter: Optional[str] = None,
+        use_langchain: bool = True,
+        session_id: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """Async version of ask_question_streaming; the full result goes to conversation_history"""
+        payload = {
+            "question": question,
+            "top_k": top_k,
+            "filename_filter": filename_filter,
+            "stream": True,
+            "session_id": session_id or self.session_id,
+            "use_langchain": use_langchain
+        }
+        
+        answer_tokens = []
+        sources = []
+        final_session_id = session_id or self.session_id
+        
+        client = self._async_client()
+        async with self._sem:
+            await self._acquire_token()
+            async with client.stream(
+                    "POST", "/ask", content=_dumps(payload), headers=SSE_POST_HEADERS) as response:
+                response.raise_for_status()
+                event_name = None
+                data_buf: List[str] = []
+                async for line in response.aiter_lines():
+                    # Same grouping as iter_sse_events, inline for the async iterator
+                    if line:
+                        if line.startswith("data:"):
+                            data_buf.append(line[6:] if line.startswith("data: ") else line[5:])
+                        elif line.startswith("event:"):
+                            event_name = line[6:].strip()
+                        continue
+                    if not data_buf:
+                        event_name = None
+                        continue
+                    
+                    kind, value = parse_sse_event(event_name, "\n".join(data_buf))
+                    event_name = None
+                    data_buf = []
+                    if kind == "token":
+                        answer_tokens.append(value)
+                        yield value
+                    elif kind == "sources":
+                        sources = value
+                    elif kind == "session":
+                        final_session_id = value
+                    elif kind == "error":
+                        raise Exception(f"Streaming error: {value}")
+                    elif kind == "end":
+                        break
+        
+        self._record_stream(question, "".join(answer_tokens), sources, final_session_id)
+    
+    async def aask_langchain(self, question: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of ask_langchain"""
+        return await self._apost("/langchain/ask", {
+            "question": question,
+            "session_id": session_id or self.session_id
+        })
+    
+    async def aask_agent(self, question: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of ask_agent"""
+        return await self._apost("/langchain/agent", {
+            "question": question,
+            "session_id": session_id or self.session_id
+        })
+    
+    async def aask_many(
+        self, 
+        questions: List[str], 
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
         """
-        Upload PDF file
+        Ask many questions concurrently, within max_concurrency and rate_limit_qpm
         
         Args:
-            file_path: Path ke file PDF
-            kategori: Kategori dokumen
+            questions: Daftar pertanyaan
+            on_progress: Callback (selesai, total) setiap satu jawaban diterima
+            **kwargs: Diteruskan ke aask_question (top_k, use_langchain, ...)
         
         Returns:
-            Dict dengan status upload
+            List jawaban, urutan sama dengan questions
         """
+        tasks = [asyncio.ensure_future(self.aask_question(q, **kwargs)) for q in questions]
+        if on_progress:
+            for done, future in enumerate(asyncio.as_completed(tasks), 1):
+                await future
+                on_progress(done, len(tasks))
+        return await asyncio.gather(*tasks)
+    
+    # === File Management ===
+    
+    @staticmethod
+    def _check_pdf_path(file_path: str) -> Path:
         file_path_obj = Path(file_path)
         if not file_path_obj.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
         if not file_path_obj.suffix.lower() == '.pdf':
             raise ValueError("Only PDF files are supported")
+        return file_path_obj
+    
+    def upload_file(self, file_path: str, kategori: str = "document") -> Dict[str, Any]:
+        """
+        Upload PDF file
+        
+        Args:
+            file_path: Path ke file PDF
+            kategori: Kategori dokumen
+        
+        Returns:
+            Dict dengan status upload
+        """
+        file_path_obj = self._check_pdf_path(file_path)
         
         with open(file_path_obj, 'rb') as f:
-            files = {"file": (file_path_obj.name, f, "application/pdf")}
-            data = {"kategori": kategori}
-            
-            response = self.session.post(
-                f"{self.base_url}/upload", 
-                files=files, 
-                data=data
-            )
+            if MULTIPART_STREAMING_AVAILABLE:
+                # Stream the multipart body from disk instead of building it in memory
+                encoder = MultipartEncoder(fields={
+                    "kategori": kategori,
+                    "file": (file_path_obj.name, f, "application/pdf")
+                })
+                response = self.session.post(
+                    f"{self.base_url}/upload", 
+                    data=encoder, 
+                    headers={"Content-Type": encoder.content_type}
+                )
+            else:
+                files = {"file": (file_path_obj.name, f, "application/pdf")}
+                data = {"kategori": kategori}
+                
+                response = self.session.post(
+                    f"{self.base_url}/upload", 
+                    files=files, 
+                    data=data
+                )
         
         response.raise_for_status()
-        return response.json()
+        # New document - cached answers may be stale
+        self.cache.clear()
+        return _loads(response.content)
+    
+    async def aupload_file(self, file_path: str, kategori: str = "document") -> Dict[str, Any]:
+        """Async version of upload_file; httpx streams the file from disk"""
+        file_path_obj = self._check_pdf_path(file_path)
+        
+        with open(file_path_obj, 'rb') as f:
+            result = await self._arequest(
+                "POST", "/upload",
+                files={"file": (file_path_obj.name, f, "application/pdf")},
+                data={"kategori": kategori}
+            )
+        self.cache.clear()
+        return result
     
     def list_files(self) -> List[Dict[str, Any]]:
         """List semua file yang telah diproses"""
         response = self.session.get(f"{self.base_url}/files")
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     def delete_file(self, filename: str) -> Dict[str, Any]:
         """Delete file dan semua chunks-nya"""
         response = self.session.delete(f"{self.base_url}/files/{filename}")
         response.raise_for_status()
-        return response.json()
+        self.cache.clear()
+        return _loads(response.content)
     
     def build_vectorstore(self) -> Dict[str, Any]:
         """Build/rebuild vector database"""
         response = self.session.post(f"{self.base_url}/build-vectorstore")
         response.raise_for_status()
-        return response.json()
+        self.cache.clear()
+        return _loads(response.content)
     
     # === Session Management ===
     
@@ -279,21 +903,22 @@ class TanyaMailLangChainClient:
         """Get daftar semua sesi aktif"""
         response = self.session.get(f"{self.base_url}/sessions")
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     def get_conversation_history(self, session_id: Optional[str] = None) -> Dict[str, Any]:
         """Get conversation history untuk session"""
         sid = session_id or self.session_id
         response = self.session.get(f"{self.base_url}/conversation/history/{sid}")
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     def clear_conversation_history(self, session_id: Optional[str] = None) -> Dict[str, Any]:
         """Clear conversation history"""
         sid = session_id or self.session_id
         response = self.session.delete(f"{self.base_url}/conversation/history/{sid}")
         response.raise_for_status()
-        return response.json()
+        self.cache.clear()
+        return _loads(response.content)
     
     def export_conversation(self, session_id: Optional[str] = None, save_path: Optional[str] = None) -> str:
         """
@@ -307,15 +932,20 @@ class TanyaMailLangChainClient:
             Path ke file yang disimpan
         """
         sid = session_id or self.session_id
-        response = self.session.get(f"{self.base_url}/conversation/export/{sid}")
-        response.raise_for_status()
+        response = self.session.get(f"{self.base_url}/conversation/export/{sid}", stream=True)
         
-        if not save_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            save_path = f"conversation_{sid[:8]}_{timestamp}.json"
-        
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+        with response:
+            response.raise_for_status()
+            
+            if not save_path:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                sid_short = self._sid_short if sid == self.session_id else sid[:8]
+                save_path = f"conversation_{sid_short}_{timestamp}.json"
+            
+            # Write as it arrives; iter_content (not response.raw) undoes gzip
+            with open(save_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=EXPORT_CHUNK_SIZE):
+                    f.write(chunk)
         
         return save_path
     
@@ -330,10 +960,11 @@ class TanyaMailLangChainClient:
         
         response = self.session.post(
             f"{self.base_url}/conversation/config/{sid}", 
-            json=payload
+            data=_dumps(payload),
+            headers=JSON_HEADERS
         )
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     # === Search ===
     
@@ -354,6 +985,11 @@ class TanyaMailLangChainClient:
         Returns:
             List hasil pencarian dengan similarity scores
         """
+        cache_params = ("search", top_k, filename_filter)
+        cached = self.cache.get(query, cache_params)
+        if cached is not None:
+            return cached
+        
         params = {
             "query": query,
             "top_k": top_k
@@ -363,7 +999,9 @@ class TanyaMailLangChainClient:
             
         response = self.session.get(f"{self.base_url}/search", params=params)
         response.raise_for_status()
-        return response.json()
+        results = _loads(response.content)
+        self.cache.put(query, cache_params, results)
+        return results
     
     # === Utility Methods ===
     
@@ -412,27 +1050,18 @@ class TanyaMailLangChainClient:
                     continue
                 
                 # Special commands
-                if question.lower() in ['exit', 'quit', 'bye']:
+                if question.lower() in self._EXIT:
                     print("👋 Goodbye!")
                     break
-                elif question == '/help':
-                    self._show_chat_help()
-                    continue
-                elif question == '/status':
-                    self.print_status()
-                    continue
-                elif question == '/history':
-                    self._show_local_history()
-                    continue
-                elif question == '/clear':
-                    self.conversation_history.clear()
-                    print("🧹 Local history cleared!")
-                    continue
-                elif question == '/files':
-                    self._show_files()
-                    continue
-                elif question.startswith('/export'):
-                    self._export_current_session()
+                
+                command, _, arg = question.partition(' ')
+                arg = arg.strip()
+                handler = self._commands.get(command)
+                if handler is not None and (not arg or command in self._ARG_COMMANDS):
+                    if arg:
+                        handler(arg)
+                    else:
+                        handler()
                     continue
                 
                 print("\n🤖 Jawaban:", end=" ")
@@ -475,7 +1104,7 @@ class TanyaMailLangChainClient:
 /history  - Show local conversation history
 /clear    - Clear local history
 /files    - Show uploaded files
-/export   - Export current session
+/export [path] - Export current session
 exit/quit/bye - Exit chat
 """
         print(help_text)
@@ -489,7 +1118,8 @@ exit/quit/bye - Exit chat
         print(f"\n📝 LOCAL CONVERSATION HISTORY ({len(self.conversation_history)} exchanges):")
         print("-" * 50)
         
-        for i, exchange in enumerate(self.conversation_history[-5:], 1):  # Last 5
+        recent = itertools.islice(self.conversation_history, max(0, len(self.conversation_history) - 5), None)
+        for i, exchange in enumerate(recent, 1):  # Last 5
             print(f"\n{i}. Q: {exchange['question'][:100]}...")
             print(f"   A: {exchange['answer'][:150]}...")
             if exchange.get('sources'):
@@ -512,10 +1142,15 @@ exit/quit/bye - Exit chat
         except Exception as e:
             print(f"❌ Error listing files: {e}")
     
-    def _export_current_session(self):
+    def _clear_local_history(self):
+        """Clear local conversation history"""
+        self.conversation_history.clear()
+        print("🧹 Local history cleared!")
+    
+    def _export_current_session(self, save_path: Optional[str] = None):
         """Export current session"""
         try:
-            file_path = self.export_conversation()
+            file_path = self.export_conversation(save_path=save_path)
             print(f"📁 Conversation exported to: {file_path}")
         except Exception as e:
             print(f"❌ Export failed: {e}")
@@ -0,0 +1,36 @@
+"""
+Embedding Quantization for Tanya Ma'il
+Symmetric int8 quantization with a per-vector scale, used to store chunk
+embeddings in MongoDB at 1 byte per dimension instead of a BSON double (8 bytes),
+plus lossless float32 packing for the embedding cache.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from bson.binary import Binary
+
+
+def quantize_embedding(embedding: Sequence[float]) -> Tuple[Binary, float]:
+    """Quantize embedding to int8 bytes plus the scale needed to restore it"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return Binary(quantized.tobytes()), scale
+
+
+def pack_float32(embedding: Sequence[float]) -> Binary:
+    """Pack embedding as float32 bytes (lossless for API embeddings)"""
+    return Binary(np.asarray(embedding, dtype=np.float32).tobytes())
+
+
+def unpack_float32(data: bytes) -> List[float]:
+    """Restore an embedding packed by pack_float32"""
+    return np.frombuffer(data, dtype=np.float32).tolist()
+
+
+def quantized_fields(embedding: Sequence[float]) -> dict:
+    """Mongo document fields for a quantized embedding"""
+    data, scale = quantize_embedding(embedding)
+    return {"embedding_q8": data, "embedding_scale": scale}
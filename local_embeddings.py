@@ -0,0 +1,166 @@
+"""
+Embedding backends for Tanya Ma'il
+Selects between OpenAI embeddings, a local Infinity server
+(https://github.com/michaelfeil/infinity) and in-process sentence-transformers
+via EMBEDDING_BACKEND.
+"""
+
+import os
+from functools import lru_cache
+from typing import List, Tuple
+
+import httpx
+import requests
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from dotenv import load_dotenv
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+INFINITY_URL = os.getenv("INFINITY_URL", "http://localhost:7997")
+INFINITY_MODEL = os.getenv(
+    "INFINITY_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", INFINITY_MODEL)
+# Pooled keep-alive clients shared by every OpenAI / LangChain OpenAI client in
+# the process, so calls reuse TLS connections instead of handshaking each time
+OPENAI_HTTP_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=50, keepalive_expiry=120)
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+OPENAI_HTTP_CLIENT = httpx.Client(
+    http2=HTTP2_AVAILABLE, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+OPENAI_ASYNC_HTTP_CLIENT = httpx.AsyncClient(
+    http2=HTTP2_AVAILABLE, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+
+# "torch" wraps the model in torch.compile, "onnx" runs it on ONNX Runtime;
+# anything else leaves the eager PyTorch model (fastest startup)
+COMPILE_EMBEDDINGS = os.getenv("COMPILE_EMBEDDINGS", "").lower()
+
+
+class InfinityEmbeddings(Embeddings):
+    """LangChain embeddings backed by an Infinity server (OpenAI-compatible /embeddings)"""
+
+    def __init__(self, base_url: str = INFINITY_URL, model: str = INFINITY_MODEL,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        response = self.session.post(
+            f"{self.base_url}/embeddings",
+            json={"model": self.model, "input": texts},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches"""
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self._embed(texts[start:start + self.batch_size]))
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return self._embed([text])[0]
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """LangChain embeddings running a sentence-transformers model in-process"""
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, compile_mode: str = COMPILE_EMBEDDINGS):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError(
+                "sentence-transformers is required for EMBEDDING_BACKEND=local")
+        self.batch_size = batch_size
+
+        if compile_mode == "onnx":
+            self.model = SentenceTransformer(model, backend="onnx")
+        else:
+            self.model = SentenceTransformer(model)
+            if compile_mode in ("1", "true", "torch"):
+                import torch
+                transformer = self.model[0]
+                transformer.auto_model = torch.compile(
+                    transformer.auto_model, dynamic=True)
+
+        # Pay compilation / session setup once at startup, not on first request
+        self.embed_query("warmup")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches"""
+        return self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return self.embed_documents([text])[0]
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embeddings backend with an in-process LRU cache for queries"""
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self._embed_query = lru_cache(maxsize=maxsize)(self._embed_query_uncached)
+
+    def _embed_query_uncached(self, text: str) -> Tuple[float, ...]:
+        return tuple(self.embeddings.embed_query(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts (documents are not cached)"""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query, reusing the vector for repeated queries"""
+        return list(self._embed_query(text))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts asynchronously with the wrapped backend"""
+        return await self.embeddings.aembed_documents(texts)
+
+
+def create_embeddings() -> Embeddings:
+    """Create embeddings for the configured EMBEDDING_BACKEND, with query caching"""
+    embeddings = _create_backend()
+    if QUERY_EMBEDDING_CACHE_SIZE > 0:
+        return CachedQueryEmbeddings(embeddings)
+    return embeddings
+
+
+def _create_backend() -> Embeddings:
+    if EMBEDDING_BACKEND == "infinity":
+        return InfinityEmbeddings()
+    if EMBEDDING_BACKEND == "local":
+        return SentenceTransformerEmbeddings()
+    if EMBEDDING_BACKEND != "openai":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+
+    return OpenAIEmbeddings(
+        model=OPENAI_EMBEDDING_MODEL,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        chunk_size=EMBEDDING_BATCH_SIZE,
+        http_client=OPENAI_HTTP_CLIENT,
+        http_async_client=OPENAI_ASYNC_HTTP_CLIENT
+    )
@@ -8,6 +8,7 @@ db.createCollection('pdf_docs');
 db.pdf_docs.createIndex({ "filename": 1 });
 db.pdf_docs.createIndex({ "doc_id": 1 }, { unique: true });
 db.pdf_docs.createIndex({ "file_hash": 1 });
+db.pdf_docs.createIndex({ "filename": 1, "file_hash": 1 });
 db.pdf_docs.createIndex({ "kategori": 1 });
 
 print('Tanya Ma'il database initialized successfully!');
@@ -0,0 +1,73 @@
+"""
+PDF Text Extraction for Tanya Ma'il
+PyMuPDF page extraction, sharded across worker processes for large PDFs.
+Holds no app state so worker processes can import it cheaply.
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+PDF_TEXT_FLAGS = (fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE |
+                  fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_DEHYPHENATE)
+# Smaller PDFs are extracted inline - process hand-off would cost more than it saves
+PDF_PARALLEL_MIN_PAGES = 32
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def iter_pdf_text(pdf_path: str) -> Iterator[str]:
+    """Yield text of each PDF page"""
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            yield page.get_text("text", flags=PDF_TEXT_FLAGS)
+
+
+def _extract_page_range(args: Tuple[str, int, int]) -> List[str]:
+    """Extract pages [start, end) in a worker with its own MuPDF context"""
+    pdf_path, start, end = args
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text("text", flags=PDF_TEXT_FLAGS) for i in range(start, end)]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a threaded server process is unsafe for MuPDF
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def iter_page_texts(pdf_path: str) -> Iterator[str]:
+    """Yield text of every page in order, extracted across processes for large PDFs"""
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        yield from iter_pdf_text(pdf_path)
+        return
+
+    step = -(-page_count // PDF_WORKERS)
+    ranges = [(pdf_path, start, min(start + step, page_count))
+              for start in range(0, page_count, step)]
+
+    # map yields ranges in order as soon as each is done
+    for page_range in _get_executor().map(_extract_page_range, ranges):
+        yield from page_range
+
+
+def get_page_texts(pdf_path: str) -> List[str]:
+    """Extract text of every page"""
+    return list(iter_page_texts(pdf_path))
+
+
+def shutdown_pdf_workers():
+    """Stop the extraction worker processes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -72,6 +72,7 @@ if [ $# -eq 0 ]; then
     echo "  --dry-run           Preview file tanpa memproses"
     echo "  --folder <folder>   Folder sumber PDF (default: pdf_input)"
     echo "  --force             Force reprocess file yang sudah ada"
+    echo "  --copy              Salin PDF ke pdf_documents"
     echo ""
     echo "Contoh:"
     echo "  $0                           # Proses semua PDF di pdf_input"
@@ -0,0 +1,190 @@
+"""
+Semantic Q&A Cache for Tanya Ma'il
+Two-tier cache in front of the RAG pipeline:
+1. Exact match - SHA256 of the normalized question (Redis, in-process fallback)
+2. Semantic match - nearest cached question by embedding cosine distance (Chroma)
+
+Chroma does not support several processes writing one persistent directory, so
+each worker keeps its own semantic tier under persist_dir/pid-<pid>; clear()
+reaches the other workers through a generation counter in Redis.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import atexit
+import hashlib
+from typing import Dict, Any, Optional, Tuple
+
+import chromadb
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+EXACT_KEY_PREFIX = "qa:exact:"
+GENERATION_KEY = "qa:generation"
+CACHE_COLLECTION_NAME = "qa_cache"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize question so trivially different phrasings share a key"""
+    return _WHITESPACE_RE.sub(" ", question).strip().lower().rstrip("?!. ")
+
+
+class SemanticCache:
+    """Exact + semantic cache for answered questions"""
+
+    def __init__(
+        self,
+        embeddings,
+        persist_dir: str = "chroma_cache_db",
+        redis_url: Optional[str] = None,
+        ttl: int = 600,
+        distance_threshold: float = 0.15
+    ):
+        self.embeddings = embeddings
+        self.ttl = ttl
+        self.distance_threshold = distance_threshold
+
+        # Tier 1: Redis when configured, otherwise a local dict with expiry
+        self.redis = None
+        self._local: Dict[str, Tuple[float, str]] = {}
+        if redis_url and REDIS_AVAILABLE:
+            try:
+                self.redis = redis.Redis.from_url(redis_url)
+                self.redis.ping()
+            except Exception as e:
+                print(f"⚠️ Redis cache unavailable, using in-process cache: {e}")
+                self.redis = None
+
+        # Tier 2: this process's own Chroma collection indexed by question embedding.
+        # A leftover directory from a previous process with the same pid is stale.
+        self._persist_dir = os.path.join(persist_dir, f"pid-{os.getpid()}")
+        shutil.rmtree(self._persist_dir, ignore_errors=True)
+        atexit.register(shutil.rmtree, self._persist_dir, True)
+        self._chroma = chromadb.PersistentClient(path=self._persist_dir)
+        self.collection = self._chroma.get_or_create_collection(
+            CACHE_COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+        self._generation = self._current_generation()
+
+    def _current_generation(self) -> int:
+        return int(self.redis.get(GENERATION_KEY) or 0) if self.redis is not None else 0
+
+    def _reset_collection(self):
+        self._chroma.delete_collection(CACHE_COLLECTION_NAME)
+        self.collection = self._chroma.get_or_create_collection(
+            CACHE_COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+
+    def _sync_generation(self):
+        """Drop the local semantic tier if another worker cleared the cache"""
+        generation = self._current_generation()
+        if generation != self._generation:
+            self._reset_collection()
+            self._generation = generation
+
+    def _key(self, normalized: str, filename_filter: Optional[str]) -> str:
+        raw = f"{normalized}|{filename_filter or ''}"
+        return EXACT_KEY_PREFIX + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            value = self.redis.get(key)
+            return json.loads(value) if value else None
+
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._local[key]
+            return None
+        return json.loads(value)
+
+    def _set_exact(self, key: str, payload: Dict[str, Any]):
+        value = json.dumps(payload, ensure_ascii=False)
+        if self.redis is not None:
+            self.redis.setex(key, self.ttl, value)
+        else:
+            self._local[key] = (time.time() + self.ttl, value)
+
+    def lookup(self, question: str, filename_filter: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return cached {"answer", "sources"} for question, or None on miss"""
+        try:
+            normalized = normalize_question(question)
+            key = self._key(normalized, filename_filter)
+
+            cached = self._get_exact(key)
+            if cached:
+                return cached
+
+            self._sync_generation()
+            if self.collection.count() == 0:
+                return None
+
+            embedding = self.embeddings.embed_query(normalized)
+            result = self.collection.query(
+                query_embeddings=[embedding],
+                n_results=1,
+                where={"filename_filter": filename_filter or ""}
+            )
+            if not result["ids"] or not result["ids"][0]:
+                return None
+
+            distance = result["distances"][0][0]
+            metadata = result["metadatas"][0][0]
+            if distance >= self.distance_threshold:
+                return None
+            if metadata.get("expires_at", 0) < time.time():
+                self.collection.delete(ids=[result["ids"][0][0]])
+                return None
+
+            cached = json.loads(metadata["payload"])
+            # Promote to the exact tier so the next identical hit skips embedding
+            self._set_exact(key, cached)
+            return cached
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {e}")
+            return None
+
+    def store(self, question: str, answer: str, sources: list, filename_filter: Optional[str] = None):
+        """Cache an answered question in both tiers"""
+        try:
+            normalized = normalize_question(question)
+            key = self._key(normalized, filename_filter)
+            payload = {"answer": answer, "sources": sources}
+
+            self._set_exact(key, payload)
+            self._sync_generation()
+            self.collection.upsert(
+                ids=[key],
+                embeddings=[self.embeddings.embed_query(normalized)],
+                documents=[normalized],
+                metadatas=[{
+                    "filename_filter": filename_filter or "",
+                    "payload": json.dumps(payload, ensure_ascii=False),
+                    "expires_at": time.time() + self.ttl
+                }]
+            )
+        except Exception as e:
+            print(f"Semantic cache store failed: {e}")
+
+    def clear(self):
+        """Drop all cached answers in every worker (call when the document set changes)"""
+        try:
+            if self.redis is not None:
+                for key in self.redis.scan_iter(match=f"{EXACT_KEY_PREFIX}*"):
+                    self.redis.delete(key)
+                # Other workers reset their semantic tier on their next lookup
+                self._generation = self.redis.incr(GENERATION_KEY)
+            self._local.clear()
+
+            self._reset_collection()
+        except Exception as e:
+            print(f"Semantic cache clear failed: {e}")
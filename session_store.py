@@ -0,0 +1,71 @@
+"""
+Redis Session Store for Tanya Ma'il
+Keeps legacy conversation history in Redis so it survives restarts and is
+shared by every API worker. Each session is a capped Redis list of exchanges
+plus an optional context-window setting, both expiring after SESSION_STORE_TTL.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+SESSION_STORE_TTL = int(os.getenv("SESSION_STORE_TTL", str(24 * 3600)))
+KEY_PREFIX = "conversation:"
+
+
+class RedisSessionStore:
+    """Async Redis-backed conversation history keyed by session ID"""
+
+    def __init__(self, redis_url: str, ttl: int = SESSION_STORE_TTL):
+        self.redis = redis_asyncio.Redis.from_url(redis_url)
+        self.ttl = ttl
+
+    @staticmethod
+    def _keys(session_id: str) -> Tuple[str, str]:
+        key = f"{KEY_PREFIX}{session_id}"
+        return key, f"{key}:window"
+
+    async def load(self, session_id: str) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """History and context window of a session, None if it is not stored"""
+        history_key, window_key = self._keys(session_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lrange(history_key, 0, -1)
+            pipe.get(window_key)
+            raw_history, raw_window = await pipe.execute()
+
+        if not raw_history and raw_window is None:
+            return None
+        window = int(raw_window) if raw_window is not None else None
+        return [orjson.loads(item) for item in raw_history], window
+
+    async def append(self, session_id: str, exchange: Dict[str, Any], max_history: int):
+        """Append an exchange, keeping only the newest max_history"""
+        history_key, window_key = self._keys(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(history_key, orjson.dumps(exchange))
+            pipe.ltrim(history_key, -max_history, -1)
+            pipe.expire(history_key, self.ttl)
+            pipe.expire(window_key, self.ttl)
+            await pipe.execute()
+
+    async def set_context_window(self, session_id: str, context_window: int):
+        """Persist the session's context window setting"""
+        history_key, window_key = self._keys(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(window_key, context_window, ex=self.ttl)
+            pipe.expire(history_key, self.ttl)
+            await pipe.execute()
+
+    async def delete(self, session_id: str) -> bool:
+        """Remove a session, returning whether anything was stored"""
+        return bool(await self.redis.delete(*self._keys(session_id)))
+
+    async def close(self):
+        await self.redis.aclose()
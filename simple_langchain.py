@@ -3,11 +3,11 @@ Simplified LangChain Integration for Tanya Ma'il
 """
 
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
 
 from langchain_core.documents import Document
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.callbacks import AsyncCallbackHandler
@@ -15,21 +15,67 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain.memory import ConversationBufferWindowMemory
 from langchain_core.messages import HumanMessage, AIMessage
 
+from local_embeddings import create_embeddings
+
 from dotenv import load_dotenv
 import asyncio
 
+try:
+    import redis
+    from langchain_community.chat_message_histories import RedisChatMessageHistory
+    REDIS_HISTORY_AVAILABLE = True
+except ImportError:
+    REDIS_HISTORY_AVAILABLE = False
+
 load_dotenv()
 
+# HNSW index settings for the document collection. Only applied when the
+# collection is created - rebuild chroma_pdf_db to change an existing index.
+CHROMA_COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 128
+}
+
+# Ask HNSW for k * SEARCH_CANDIDATE_FACTOR neighbours and keep the first k.
+# hnswlib searches with ef >= n_results, so over-fetching raises recall on
+# collections built before search_ef was raised. 1 disables over-fetching.
+SEARCH_CANDIDATE_FACTOR = int(os.getenv("SEARCH_CANDIDATE_FACTOR", "4"))
+
+MEMORY_WINDOW = 5  # exchanges kept per session
+REDIS_HISTORY_TTL = int(os.getenv("REDIS_HISTORY_TTL", "3600"))
+REDIS_HISTORY_PREFIX = "hist:"
+
+
+if REDIS_HISTORY_AVAILABLE:
+    class TrimmedRedisChatMessageHistory(RedisChatMessageHistory):
+        """Redis chat history that keeps only the newest max_messages"""
+
+        def __init__(self, session_id: str, url: str, ttl: int, max_messages: int):
+            super().__init__(session_id, url=url, key_prefix=REDIS_HISTORY_PREFIX, ttl=ttl)
+            self.max_messages = max_messages
+
+        def add_message(self, message) -> None:
+            super().add_message(message)
+            self.redis_client.ltrim(self.key, 0, self.max_messages - 1)
+
 
 class SimpleLangChainRAG:
     """Simplified LangChain RAG system"""
     
-    def __init__(self, mongo_collection, chroma_persist_dir: str = "chroma_pdf_db"):
+    def __init__(self, mongo_collection, chroma_persist_dir: str = "chroma_pdf_db",
+                 llm: Optional[ChatOpenAI] = None, embeddings=None,
+                 vectorstore: Optional[Chroma] = None, redis_url: Optional[str] = None):
         self.mongo_collection = mongo_collection
         self.chroma_persist_dir = chroma_persist_dir
+        # Conversation turns live in Redis when configured, shared across workers
+        self.redis_url = redis_url if REDIS_HISTORY_AVAILABLE else None
+        # Shared client for existence checks that must not create per-session memory
+        self.redis_client = redis.Redis.from_url(self.redis_url) if self.redis_url else None
         
-        # Initialize core components
-        self.llm = ChatOpenAI(
+        # Initialize core components (shared instances may be injected)
+        self.llm = llm or ChatOpenAI(
             model_name=os.getenv("MODEL_NAME", "gpt-4o-mini"),
             temperature=float(os.getenv("MODEL_TEMPERATURE", "0")),
             max_tokens=int(os.getenv("MODEL_MAX_TOKENS", "2048")),
@@ -37,10 +83,7 @@ class SimpleLangChainRAG:
             streaming=True
         )
         
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.embeddings = embeddings or create_embeddings()
         
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -49,18 +92,21 @@ class SimpleLangChainRAG:
         )
         
         # Initialize vectorstore if exists
-        self.vectorstore = None
-        if os.path.exists(self.chroma_persist_dir):
+        self.vectorstore = vectorstore
+        if self.vectorstore is None and os.path.exists(self.chroma_persist_dir):
             try:
                 self.vectorstore = Chroma(
                     persist_directory=self.chroma_persist_dir,
-                    embedding_function=self.embeddings
+                    embedding_function=self.embeddings,
+                    collection_metadata=CHROMA_COLLECTION_METADATA
                 )
             except Exception as e:
                 print(f"Failed to load vectorstore: {e}")
                 
         # Memory for conversations
         self.memories: Dict[str, ConversationBufferWindowMemory] = {}
+        # Exchanges recorded per session, so listings need not rebuild histories
+        self.total_exchanges: Dict[str, int] = {}
         
         # System prompt
         self.system_prompt = ChatPromptTemplate.from_messages([
@@ -80,21 +126,68 @@ class SimpleLangChainRAG:
     def get_memory(self, session_id: str) -> ConversationBufferWindowMemory:
         """Get or create memory for session"""
         if session_id not in self.memories:
+            extra = {}
+            if self.redis_url:
+                extra["chat_memory"] = TrimmedRedisChatMessageHistory(
+                    session_id,
+                    url=self.redis_url,
+                    ttl=REDIS_HISTORY_TTL,
+                    max_messages=MEMORY_WINDOW * 2
+                )
             self.memories[session_id] = ConversationBufferWindowMemory(
-                k=5,
+                k=MEMORY_WINDOW,
                 memory_key="chat_history",
-                return_messages=True
+                return_messages=True,
+                **extra
             )
         return self.memories[session_id]
     
+    def has_history(self, session_id: str) -> bool:
+        """Check whether session already has conversation turns (read-only, blocking on Redis)"""
+        if self.redis_client is not None:
+            return bool(self.redis_client.exists(f"{REDIS_HISTORY_PREFIX}{session_id}"))
+        memory = self.memories.get(session_id)
+        return bool(memory and memory.chat_memory.messages)
+    
+    def remember_exchange(self, session_id: str, question: str, answer: str) -> None:
+        """Record an exchange answered outside the LLM (e.g. from cache)"""
+        self._save_exchange(self.get_memory(session_id), session_id, question, answer)
+    
+    @staticmethod
+    def _format_chat_history(memory: ConversationBufferWindowMemory) -> str:
+        """Last 3 exchanges as Q:/A: lines"""
+        messages = memory.chat_memory.messages[-6:]
+        history_parts = []
+        for i in range(0, len(messages) - 1, 2):
+            human_msg = messages[i]
+            ai_msg = messages[i + 1]
+            if isinstance(human_msg, HumanMessage) and isinstance(ai_msg, AIMessage):
+                history_parts.append(f"Q: {human_msg.content}")
+                history_parts.append(f"A: {ai_msg.content}")
+        return "\n".join(history_parts)
+    
+    def _save_exchange(self, memory: ConversationBufferWindowMemory, session_id: str,
+                       question: str, answer: str) -> None:
+        memory.save_context(
+            {"input": question},
+            {"output": answer}
+        )
+        self.total_exchanges[session_id] = self.total_exchanges.get(session_id, 0) + 1
+    
+    def exchange_counts(self) -> Dict[str, int]:
+        """Number of exchanges recorded per session"""
+        return self.total_exchanges
+    
     def search_documents(self, query: str, k: int = 5) -> List[Document]:
         """Search for relevant documents"""
         if not self.vectorstore:
             return []
         
         try:
-            results = self.vectorstore.similarity_search(query, k=k)
-            return results
+            # Chroma returns candidates best first by cosine distance
+            results = self.vectorstore.similarity_search(
+                query, k=k * max(1, SEARCH_CANDIDATE_FACTOR))
+            return results[:k]
         except Exception as e:
             print(f"Search failed: {e}")
             return []
@@ -107,7 +200,11 @@ class SimpleLangChainRAG:
         for doc in chroma_docs:
             doc_id = doc.metadata.get("doc_id")
             if doc_id:
-                mongo_doc = self.mongo_collection.find_one({"doc_id": doc_id})
+                mongo_doc = self.mongo_collection.find_one(
+                    {"doc_id": doc_id},
+                    {"_id": 0, "upload_date": 1, "file_hash": 1, "chunk_id": 1,
+                     "kategori": 1, "chunk_size": 1}
+                )
                 if mongo_doc:
                     enhanced_doc = {
                         "content": doc.page_content,
@@ -128,7 +225,7 @@ class SimpleLangChainRAG:
         """Ask question with memory"""
         try:
             # Get relevant documents
-            docs = self.get_enhanced_documents(question, k=5)
+            docs = await asyncio.to_thread(self.get_enhanced_documents, question, 5)
             if not docs:
                 return {
                     "answer": "Tidak ada dokumen relevan ditemukan untuk pertanyaan Anda.",
@@ -148,23 +245,9 @@ class SimpleLangChainRAG:
             
             context = "\n\n---\n\n".join(context_parts)
             
-            # Get memory and format chat history
+            # Get memory and format chat history (Redis reads run off the event loop)
             memory = self.get_memory(session_id)
-            chat_history = ""
-            
-            if hasattr(memory, 'chat_memory') and memory.chat_memory.messages:
-                history_parts = []
-                messages = memory.chat_memory.messages[-6:]  # Last 3 exchanges
-                
-                for i in range(0, len(messages), 2):
-                    if i + 1 < len(messages):
-                        human_msg = messages[i]
-                        ai_msg = messages[i + 1]
-                        if isinstance(human_msg, HumanMessage) and isinstance(ai_msg, AIMessage):
-                            history_parts.append(f"Q: {human_msg.content}")
-                            history_parts.append(f"A: {ai_msg.content}")
-                
-                chat_history = "\n".join(history_parts)
+            chat_history = await asyncio.to_thread(self._format_chat_history, memory)
             
             # Create prompt and get response
             prompt = self.system_prompt.format(
@@ -177,10 +260,7 @@ class SimpleLangChainRAG:
             answer = response.content
             
             # Save to memory
-            memory.save_context(
-                {"input": question},
-                {"output": answer}
-            )
+            await asyncio.to_thread(self._save_exchange, memory, session_id, question, answer)
             
             return {
                 "answer": answer,
@@ -196,7 +276,7 @@ class SimpleLangChainRAG:
         """Ask question with streaming response"""
         try:
             # Get relevant documents
-            docs = self.get_enhanced_documents(question, k=5)
+            docs = await asyncio.to_thread(self.get_enhanced_documents, question, 5)
             if not docs:
                 await callback_handler.on_llm_new_token("Tidak ada dokumen relevan ditemukan untuk pertanyaan Anda.")
                 await callback_handler.on_llm_end(None)
@@ -218,23 +298,9 @@ class SimpleLangChainRAG:
             
             context = "\n\n---\n\n".join(context_parts)
             
-            # Get memory and format chat history
+            # Get memory and format chat history (Redis reads run off the event loop)
             memory = self.get_memory(session_id)
-            chat_history = ""
-            
-            if hasattr(memory, 'chat_memory') and memory.chat_memory.messages:
-                history_parts = []
-                messages = memory.chat_memory.messages[-6:]
-                
-                for i in range(0, len(messages), 2):
-                    if i + 1 < len(messages):
-                        human_msg = messages[i]
-                        ai_msg = messages[i + 1]
-                        if isinstance(human_msg, HumanMessage) and isinstance(ai_msg, AIMessage):
-                            history_parts.append(f"Q: {human_msg.content}")
-                            history_parts.append(f"A: {ai_msg.content}")
-                
-                chat_history = "\n".join(history_parts)
+            chat_history = await asyncio.to_thread(self._format_chat_history, memory)
             
             # Create prompt and get streaming response
             prompt = self.system_prompt.format(
@@ -253,10 +319,7 @@ class SimpleLangChainRAG:
             await callback_handler.on_llm_end(None)
             
             # Save to memory
-            memory.save_context(
-                {"input": question},
-                {"output": full_answer}
-            )
+            await asyncio.to_thread(self._save_exchange, memory, session_id, question, full_answer)
             
             return {
                 "answer": full_answer,
@@ -266,35 +329,42 @@ class SimpleLangChainRAG:
             }
             
         except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            await callback_handler.on_llm_new_token(error_msg)
-            await callback_handler.on_llm_end(None)
+            await callback_handler.on_llm_error(e)
             raise e
+        finally:
+            # Never leave the consumer waiting, even when cancelled
+            await callback_handler.on_llm_end(None)
     
-    def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
-        """Get formatted conversation history"""
+    def iter_conversation_history(self, session_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield formatted exchanges one at a time"""
+        if not self.has_history(session_id):
+            return
         memory = self.get_memory(session_id)
-        history = []
         
-        if hasattr(memory, 'chat_memory') and memory.chat_memory.messages:
+        if hasattr(memory, 'chat_memory'):
             messages = memory.chat_memory.messages
-            for i in range(0, len(messages), 2):
-                if i + 1 < len(messages):
-                    human_msg = messages[i]
-                    ai_msg = messages[i + 1]
-                    if isinstance(human_msg, HumanMessage) and isinstance(ai_msg, AIMessage):
-                        history.append({
-                            "question": human_msg.content,
-                            "answer": ai_msg.content,
-                            "timestamp": datetime.now().isoformat()
-                        })
-        
-        return history
+            for i in range(0, len(messages) - 1, 2):
+                human_msg = messages[i]
+                ai_msg = messages[i + 1]
+                if isinstance(human_msg, HumanMessage) and isinstance(ai_msg, AIMessage):
+                    yield {
+                        "question": human_msg.content,
+                        "answer": ai_msg.content,
+                        "timestamp": datetime.now().isoformat()
+                    }
+    
+    def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get formatted conversation history"""
+        return list(self.iter_conversation_history(session_id))
     
     def clear_conversation_history(self, session_id: str) -> bool:
         """Clear conversation history for session"""
-        if session_id in self.memories:
-            self.memories[session_id].clear()
+        memory = self.memories.pop(session_id, None)
+        self.total_exchanges.pop(session_id, None)
+        if self.redis_client is not None:
+            return bool(self.redis_client.delete(f"{REDIS_HISTORY_PREFIX}{session_id}"))
+        if memory is not None:
+            memory.clear()
             return True
         return False
     
@@ -308,20 +378,29 @@ class SimpleLangChainRAG:
             "total_exchanges": len(history)
         }
     
-    def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
-        """Add documents to vectorstore"""
+    def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]],
+                      embeddings: Optional[List[List[float]]] = None) -> None:
+        """Add documents to vectorstore, reusing precomputed embeddings if given"""
         try:
             if not self.vectorstore:
                 # Create new vectorstore
-                self.vectorstore = Chroma.from_texts(
-                    texts,
-                    self.embeddings,
-                    metadatas=metadatas,
-                    persist_directory=self.chroma_persist_dir
+                self.vectorstore = Chroma(
+                    persist_directory=self.chroma_persist_dir,
+                    embedding_function=self.embeddings,
+                    collection_metadata=CHROMA_COLLECTION_METADATA
                 )
+            # Chunk doc_ids as Chroma IDs: re-adding a chunk overwrites it
+            ids = [metadata["doc_id"] for metadata in metadatas]
+            if embeddings is None:
+                self.vectorstore.add_texts(texts, metadatas=metadatas, ids=ids)
             else:
-                # Add to existing vectorstore
-                self.vectorstore.add_texts(texts, metadatas=metadatas)
+                # Vectors were already computed during ingestion - don't embed twice
+                self.vectorstore._collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    documents=texts
+                )
             print(f"Added {len(texts)} documents to vectorstore")
         except Exception as e:
             print(f"Failed to add documents: {e}")
@@ -358,8 +437,9 @@ class SimpleStreamingHandler(AsyncCallbackHandler):
     """Simplified streaming callback handler"""
     
     def __init__(self):
-        self.tokens = asyncio.Queue()
+        self.tokens: asyncio.Queue = asyncio.Queue()
         self.is_streaming = False
+        self.closed = False
         
     async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs) -> None:
         """Called when LLM starts generating"""
@@ -367,16 +447,16 @@ class SimpleStreamingHandler(AsyncCallbackHandler):
         
     async def on_llm_new_token(self, token: str, **kwargs) -> None:
         """Called when LLM generates a new token"""
-        if self.is_streaming:
-            await self.tokens.put(token)
+        self.tokens.put_nowait(token)
     
     async def on_llm_end(self, response, **kwargs) -> None:
         """Called when LLM finishes generating"""
         self.is_streaming = False
-        await self.tokens.put(None)  # Signal end of stream
+        if not self.closed:
+            self.closed = True
+            self.tokens.put_nowait(None)  # Signal end of stream
         
     async def on_llm_error(self, error: Exception, **kwargs) -> None:
         """Called when LLM encounters an error"""
-        self.is_streaming = False
-        await self.tokens.put(f"Error: {str(error)}")
-        await self.tokens.put(None)
+        self.tokens.put_nowait(f"Error: {str(error)}")
+        await self.on_llm_end(None)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for SSE parsing in client_langchain.py
+Feeds the same stream cut at every possible chunk boundary, including cuts
+that fall right after a newline, and checks the events come out unchanged.
+"""
+
+from client_langchain import iter_sse_lines, iter_sse_events
+
+STREAM = (
+    'event: session_id\n'
+    'data: abc-123\n'
+    '\n'
+    'event: token\n'
+    'data: baris pertama\n'
+    'data: baris kedua masih sama\n'
+    '\n'
+    'data: {"type": "content", "token": "halo"}\r\n'
+    '\r\n'
+    'event: sources\n'
+    'data: ["doc.pdf"]\n'
+    '\n'
+)
+
+EXPECTED = [
+    ("session_id", "abc-123"),
+    ("token", "baris pertama\nbaris kedua masih sama"),
+    (None, '{"type": "content", "token": "halo"}'),
+    ("sources", '["doc.pdf"]'),
+]
+
+
+def test_sse_chunk_boundaries():
+    """Every split of the stream into two or more chunks yields the same events"""
+    print("🧪 Testing SSE chunk boundaries")
+    print("=" * 40)
+    
+    for cut in range(len(STREAM) + 1):
+        chunks = [STREAM[:cut], STREAM[cut:]]
+        events = list(iter_sse_events(iter_sse_lines(chunks)))
+        assert events == EXPECTED, f"cut at {cut}: {events}"
+    
+    # One character per chunk: every newline ends a chunk
+    events = list(iter_sse_events(iter_sse_lines(list(STREAM))))
+    assert events == EXPECTED, f"single-character chunks: {events}"
+    
+    print(f"✅ {len(STREAM) + 2} chunkings parsed into {len(EXPECTED)} events")
+    print("\n🎉 All SSE parsing tests passed!")
+
+if __name__ == "__main__":
+    test_sse_chunk_boundaries()
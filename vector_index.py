@@ -0,0 +1,109 @@
+"""
+In-process vector index for Tanya Ma'il
+Holds all chunk embeddings as one L2-normalized float32 matrix so a query is a
+single matrix-vector product instead of a ChromaDB (SQLite + HNSW) round-trip.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def embedding_from_doc(doc: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Embedding of a stored chunk, plain or int8-quantized, as float32"""
+    if doc.get("embedding_q8") is not None:
+        # The per-vector scale cancels out once the row is normalized
+        return np.frombuffer(doc["embedding_q8"], dtype=np.int8).astype(np.float32)
+    if doc.get("embedding"):
+        return np.asarray(doc["embedding"], dtype=np.float32)
+    return None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """Exact cosine top-k over all chunks, rebuilt copy-on-write so searches never lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._doc_ids: List[str] = []
+        self._filenames = np.empty(0, dtype=object)
+        self._loaded_at = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def age(self) -> float:
+        """Seconds since the last full load"""
+        return time.monotonic() - self._loaded_at
+
+    def load(self, docs: Iterable[Dict[str, Any]]):
+        """Replace the index with the given Mongo chunk documents"""
+        doc_ids, filenames, rows = [], [], []
+        for doc in docs:
+            vector = embedding_from_doc(doc)
+            if vector is not None:
+                doc_ids.append(doc["doc_id"])
+                filenames.append(doc.get("filename"))
+                rows.append(vector)
+
+        matrix = _normalize_rows(np.vstack(rows)) if rows else np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self._matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+            self._doc_ids = doc_ids
+            self._filenames = np.array(filenames, dtype=object)
+            self._loaded_at = time.monotonic()
+
+    def add(self, doc_ids: Sequence[str], filenames: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Append chunks, skipping doc_ids already indexed"""
+        with self._lock:
+            known = set(self._doc_ids)
+            keep = [i for i, doc_id in enumerate(doc_ids) if doc_id not in known]
+            if not keep:
+                return
+            rows = _normalize_rows(np.asarray([embeddings[i] for i in keep], dtype=np.float32))
+            if self._matrix.size and rows.shape[1] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {rows.shape[1]} does not match index ({self._matrix.shape[1]})")
+
+            matrix = np.vstack([self._matrix, rows]) if self._matrix.size else rows
+            self._matrix = np.ascontiguousarray(matrix)
+            self._doc_ids = self._doc_ids + [doc_ids[i] for i in keep]
+            self._filenames = np.concatenate(
+                [self._filenames, np.array([filenames[i] for i in keep], dtype=object)])
+
+    def remove_filename(self, filename: str):
+        """Drop every chunk of a file"""
+        with self._lock:
+            keep = self._filenames != filename
+            if keep.all():
+                return
+            self._matrix = np.ascontiguousarray(self._matrix[keep])
+            self._doc_ids = [doc_id for doc_id, k in zip(self._doc_ids, keep) if k]
+            self._filenames = self._filenames[keep]
+
+    def search(self, query: Sequence[float], k: int,
+               filename: Optional[str] = None) -> Optional[List[Tuple[str, str, float]]]:
+        """Top-k (doc_id, filename, score) best first; None if the query does not fit the index"""
+        matrix, doc_ids, filenames = self._matrix, self._doc_ids, self._filenames
+        q = np.asarray(query, dtype=np.float32)
+        if not doc_ids or q.shape[0] != matrix.shape[1]:
+            return None
+
+        norm = np.linalg.norm(q)
+        scores = matrix @ (q / norm if norm > 0 else q)
+        if filename is not None:
+            scores = np.where(filenames == filename, scores, -np.inf)
+
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(doc_ids[i], filenames[i], float(scores[i]))
+                for i in top if scores[i] != -np.inf]